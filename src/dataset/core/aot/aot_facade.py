@@ -3,6 +3,23 @@ from dataset.core.aot.entity_facade import EntityFacade
 from dataset.legacy.AoT import Root, Structure, Component, Layout, Entity
 from dataset.legacy.Attribute import Angle
 
+# Entity attributes that can be read and written in bulk
+ENTITY_ATTRIBUTES = ("type", "size", "color", "angle")
+
+# EntityFacade getter and setter for each entity attribute
+_ENTITY_GETTERS = {
+    "type": EntityFacade.get_type,
+    "size": EntityFacade.get_size,
+    "color": EntityFacade.get_color,
+    "angle": EntityFacade.get_angle
+}
+_ENTITY_SETTERS = {
+    "type": EntityFacade.set_type,
+    "size": EntityFacade.set_size,
+    "color": EntityFacade.set_color,
+    "angle": EntityFacade.set_angle
+}
+
 class AoTFacade:
     """Facade providing simplified access to AoT structure."""
     
@@ -47,54 +64,65 @@ class AoTFacade:
         """Get layout from component."""
         return self._get_layout(component_idx)
     
+    def get_layout_entities(self, component_idx=0):
+        """Get the raw entity nodes of a component, or [] if it does not exist."""
+        try:
+            return self._get_layout(component_idx).children
+        except (IndexError, AttributeError):
+            return []
+    
     # Attribute access
     def get_entity_attribute(self, attr_name, component_idx=0, entity_idx=0):
         """Get attribute value from entity."""
         entity_facade = self.get_entity(component_idx, entity_idx)
-        attr_name = attr_name.lower()
-        
-        if attr_name == "angle":
-            return entity_facade.get_angle()
-        elif attr_name == "size":
-            return entity_facade.get_size()
-        elif attr_name == "type":
-            return entity_facade.get_type()
-        elif attr_name == "color":
-            return entity_facade.get_color()
-        else:
-            raise ValueError(f"Unknown attribute: {attr_name}")
+        return self._get_accessor(_ENTITY_GETTERS, attr_name)(entity_facade)
     
     def set_entity_attribute(self, attr_name, value, component_idx=0, entity_idx=None):
         """Set attribute value on entity/entities."""
-        attr_name = attr_name.lower()
+        setter = self._get_accessor(_ENTITY_SETTERS, attr_name)
         
         if entity_idx is not None:
             # Set for a specific entity
-            entity_facade = self.get_entity(component_idx, entity_idx)
-            if attr_name == "angle":
-                entity_facade.set_angle(value)
-            elif attr_name == "size":
-                entity_facade.set_size(value)
-            elif attr_name == "type":
-                entity_facade.set_type(value)
-            elif attr_name == "color":
-                entity_facade.set_color(value)
-            else:
-                raise ValueError(f"Unknown attribute: {attr_name}")
+            setter(self.get_entity(component_idx, entity_idx), value)
         else:
             # Set for all entities in the component
-            entity_facades = self.get_entities(component_idx)
-            for entity_facade in entity_facades:
-                if attr_name == "angle":
-                    entity_facade.set_angle(value)
-                elif attr_name == "size":
-                    entity_facade.set_size(value)
-                elif attr_name == "type":
-                    entity_facade.set_type(value)
-                elif attr_name == "color":
-                    entity_facade.set_color(value)
-                else:
-                    raise ValueError(f"Unknown attribute: {attr_name}")
+            for entity_facade in self.get_entities(component_idx):
+                setter(entity_facade, value)
+    
+    def get_attribute_levels(self, attr_name, component_idx=0):
+        """Get attribute value levels of all entities in a component.
+        
+        Empty if the component does not exist.
+        """
+        attr_name = attr_name.lower()
+        if attr_name not in ENTITY_ATTRIBUTES:
+            raise ValueError(f"Unknown attribute: {attr_name}")
+        
+        return [getattr(entity, attr_name).get_value_level()
+                for entity in self.get_layout_entities(component_idx)]
+    
+    def set_attribute_bulk(self, attr_name, values, component_idx=0):
+        """Set attribute values of all entities in a component in one pass.
+        
+        Args:
+            attr_name: Entity attribute ('type', 'size', 'color' or 'angle')
+            values: Single value for every entity, or a list/tuple with one
+                value per entity
+            component_idx: Component index; nothing is set if it does not exist
+        """
+        attr_name = attr_name.lower()
+        if attr_name not in ENTITY_ATTRIBUTES:
+            raise ValueError(f"Unknown attribute: {attr_name}")
+        
+        entities = self.get_layout_entities(component_idx)
+        if not entities:
+            return
+        if not isinstance(values, (list, tuple)):
+            values = [values] * len(entities)
+        elif len(values) != len(entities):
+            raise ValueError(f"Expected {len(entities)} values, got {len(values)}")
+        for entity, level in zip(entities, values):
+            getattr(entity, attr_name).set_value_level(level)
     
     # Utility methods
     def clone(self):
@@ -131,6 +159,13 @@ class AoTFacade:
         
         print("========================")
 
+    def _get_accessor(self, accessors, attr_name):
+        """Look up the EntityFacade getter or setter for an attribute name."""
+        try:
+            return accessors[attr_name.lower()]
+        except KeyError:
+            raise ValueError(f"Unknown attribute: {attr_name.lower()}")
+
     def _get_structure(self):
         """Get the structure node from the root."""
         try:
@@ -86,24 +86,37 @@ class AoTSampler:
         new_node.uniformity.sample()
         
         # Create entities based on sampled values
-        if new_node.uniformity.get_value():
+        new_node.children = self.create_entities(positions, new_node.uniformity.get_value(),
+                                                 new_node.entity_constraint)
+        
+        return new_node
+    
+    def create_entities(self, positions, uniform, entity_constraint):
+        """Create one entity per position, collected in a list so that the
+        layout's children can be assigned in one step.
+        
+        Args:
+            positions: Entity bounding boxes
+            uniform: Whether all entities share the attributes of the first one
+            entity_constraint: Constraints for entity attributes
+            
+        Returns:
+            List of new entities named by position index
+        """
+        if uniform:
             # Create identical entities
-            node = self.create_entity("0", positions[0], new_node.entity_constraint)
-            new_node.insert(node)
+            node = self.create_entity("0", positions[0], entity_constraint)
+            entities = [node]
             for i in range(1, len(positions)):
                 # Copy the first entity for others (same attributes)
                 node_copy = copy.deepcopy(node)
                 node_copy.name = str(i)
                 node_copy.bbox = positions[i]
-                new_node.insert(node_copy)
-        else:
-            # Create different entities
-            for i in range(len(positions)):
-                # Create new entity with independent attributes
-                node = self.create_entity(str(i), positions[i], new_node.entity_constraint)
-                new_node.insert(node)
+                entities.append(node_copy)
+            return entities
         
-        return new_node
+        # Create different entities with independent attributes
+        return [self.create_entity(str(i), positions[i], entity_constraint) for i in range(len(positions))]
     
     def create_entity(self, name, bbox, entity_constraint):
         """Create a new entity with sampled attributes.
@@ -185,29 +198,11 @@ class AoTSampler:
         if change_number:
             layout.number.sample()
         
-        # Clear existing entities
-        del layout.children[:]
-        
         # Resample positions based on number
         layout.position.sample(layout.number.get_value())
         positions = layout.position.get_value()
         
-        # Create new entities
-        if layout.uniformity.get_value():
-            # Create identical entities
-            node = self.create_entity("0", positions[0], layout.entity_constraint)
-            layout.insert(node)
-            for i in range(1, len(positions)):
-                # Copy the first entity for others (same attributes)
-                node_copy = copy.deepcopy(node)
-                node_copy.name = str(i)
-                node_copy.bbox = positions[i]
-                layout.insert(node_copy)
-        else:
-            # Create different entities
-            for i in range(len(positions)):
-                # Create new entity with independent attributes
-                node = self.create_entity(str(i), positions[i], layout.entity_constraint)
-                layout.insert(node)
+        # Replace the existing entities with new ones
+        layout.children = self.create_entities(positions, layout.uniformity.get_value(), layout.entity_constraint)
 
     # Other sampling methods
@@ -1,5 +1,15 @@
 from dataset.core.handlers.base import AttributeHandler
 
+# Shape names indexed by type value (index 0 is unused)
+_SHAPE_NAMES = (None, "triangle", "square", "pentagon", "hexagon", "circle")
+
+# Total number of shape types
+_SHAPE_COUNT = 5
+
+# _NEXT_SHAPE[steps][current - 1] is the shape `steps` after `current`, cycling between 1-5
+_NEXT_SHAPE = tuple(tuple(((current - 1 + steps) % _SHAPE_COUNT) + 1 for current in range(1, _SHAPE_COUNT + 1))
+                    for steps in range(_SHAPE_COUNT))
+
 class TypeHandler():
     """Handler for the Type attribute (shapes)"""
     
@@ -42,6 +52,10 @@ class TypeHandler():
             
         return facade
 
+    def _set_entity_value_unchecked(self, facade, value, component_idx, entity_idx):
+        """Set type value for an entity without clamping, for values already in 1-5."""
+        facade.set_entity_attribute("type", value, component_idx, entity_idx)
+
     def set_panel_value(self, facade, value, component_idx=0):
         """Set the same type value for all entities in the panel/component.
         
@@ -60,9 +74,7 @@ class TypeHandler():
         
         try:
             # Set type for all entities in the component
-            entity_count = facade.get_entity_count(component_idx)
-            for idx in range(entity_count):
-                facade.set_entity_attribute("type", value, component_idx, idx)
+            facade.set_attribute_bulk("type", value, component_idx)
         except Exception as e:
             raise ValueError(f"Failed to set panel value: {str(e)}")
             
@@ -70,17 +82,10 @@ class TypeHandler():
 
     def apply_constraints(self, facade, constraints, component_idx=0):
         """Apply constraints to type attribute"""
-        self._check_facade(facade)
-        
         try:
-            # Get the layout through the facade
+            # Reset the layout and all of its entities in one call
             layout = facade.get_layout(component_idx)
-            layout.entity_constraint["Type"][:] = constraints
-            
-            # Apply to all entities using the facade's access methods
-            for i in range(facade.get_entity_count(component_idx)):
-                entity = facade.get_entity(component_idx, i)
-                entity.reset_constraint("Type", constraints[0], constraints[1])
+            layout.reset_entity_constraint("Type", constraints[0], constraints[1])
         except Exception as e:
             raise ValueError(f"Failed to apply constraints: {str(e)}")
     
@@ -88,39 +93,27 @@ class TypeHandler():
         """Change to next shape type (cycling through available shapes)"""
         #self._check_facade(facade)
         
-        # Get the total number of shape types
-        SHAPE_COUNT = 5
+        next_shape = _NEXT_SHAPE[steps % _SHAPE_COUNT]
         
         if entity_idx is not None:
             # Change specific entity
             current = self.get_value(facade, component_idx, entity_idx)
-            new_value = ((current - 1 + steps) % SHAPE_COUNT) + 1  # Cycle between 1-5
-            self.set_entity_value(facade, new_value, component_idx, entity_idx)
+            new_value = next_shape[current - 1]
+            self._set_entity_value_unchecked(facade, new_value, component_idx, entity_idx)
 
         else:
             # Change all entities
-            entity_count = facade.get_entity_count(component_idx)
-            for idx in range(entity_count):
-                current = self.get_value(facade, component_idx, idx)
-                new_value = ((current - 1 + steps) % SHAPE_COUNT) + 1  # Cycle between 1-5
-                self.set_entity_value(facade, new_value, component_idx, idx)
+            for entity in facade.get_layout_entities(component_idx):
+                entity.type.set_value_level(next_shape[entity.type.get_value_level() - 1])
                 
         # Return the updated facade for method chaining
         return facade
 
     def get_shape_name(self, shape_index):
-        # Map of shape indices to names
         shape_index = int(shape_index)
-        SHAPE_NAMES = {
-            1: "triangle",
-            2: "square",
-            3: "pentagon",
-            4: "hexagon",
-            5: "circle"
-        }
         
         # Validate input
-        if not isinstance(shape_index, int) or shape_index < 1 or shape_index > 5:
+        if not 1 <= shape_index <= 5:
             raise ValueError(f"Invalid shape index: {shape_index}. Must be an integer between 1-5.")
         
-        return SHAPE_NAMES.get(shape_index)
+        return _SHAPE_NAMES[shape_index]
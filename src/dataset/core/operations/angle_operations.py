@@ -1,22 +1,30 @@
 from dataset.core.operations.base import Operation
 from dataset.legacy.const import ANGLE_VALUES
 
-class AngleAddition(Operation):
-    """Adds angle values (rotation)"""
-    def apply(self, first_value, second_value):
-        max_angles = len(ANGLE_VALUES)
-        return (first_value + second_value) % max_angles
+_MAX_ANGLES = len(ANGLE_VALUES)
+
+class AngleOp(Operation):
+    """Combines angle values (rotation) in the direction given by sign"""
+    def __init__(self, sign):
+        self._sign = sign
         
+    def apply(self, first_value, second_value):
+        return (first_value + self._sign * second_value) % _MAX_ANGLES
+    
     def adjust_constraints(self, constraints, first_value):
         """No adjustment needed for angle constraints"""
         return constraints  # Angles can cycle, so constraints remain the same
+
+class AngleAddition(AngleOp):
+    """Adds angle values (rotation)"""
+    def __init__(self):
+        super().__init__(1)
         
-class AngleSubtraction(Operation):
+class AngleSubtraction(AngleOp):
     """Subtracts angle values (reverse rotation)"""
-    def apply(self, first_value, second_value):
-        max_angles = len(ANGLE_VALUES)
-        return (first_value - second_value) % max_angles
-        
-    def adjust_constraints(self, constraints, first_value):
-        """No adjustment needed for angle constraints"""
-        return constraints  # Angles can cycle, so constraints remain the same
+    def __init__(self):
+        super().__init__(-1)
+
+# Operations hold no state, so rules share these instances
+ANGLE_ADD = AngleAddition()
+ANGLE_SUB = AngleSubtraction()
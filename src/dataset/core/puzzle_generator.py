@@ -1,10 +1,23 @@
+import os
 import random
-import copy
 import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 
 from dataset.core.aot.operations.builders import AoTBuilder
 from dataset.core.rules.factory import RuleFactory
+from dataset.legacy.sampling import sample_attr_avail, sample_attr
+
+# Stateless helpers shared by all generators in a process
+_DEFAULT_BUILDER = AoTBuilder()
+_DEFAULT_FACTORY = RuleFactory()
 
+_RULE_TYPES = ("Progression", "Constant", "Arithmetic", "DistributeThree")
+_ATTRS = ("Number", "Position", "Type", "Size", "Color")
+
+# Attributes left for the second component once the first one is taken
+_OTHER_ATTRS = {attr: tuple(other for other in _ATTRS if other != attr) for attr in _ATTRS}
 
 class PuzzleGenerator:
     """
@@ -12,45 +25,84 @@ class PuzzleGenerator:
     Responsible solely for puzzle generation logic, not visualization or storage.
     """
     
-    def __init__(self, max_attempts=10):
+    def __init__(self, max_attempts=10, builder=None, factory=None):
         """Initialize the puzzle generator.
         
         Args:
             max_attempts: Maximum number of sampling attempts
+            builder: Optional AoTBuilder (shared default if None)
+            factory: Optional RuleFactory (shared default if None)
         """
         self.max_attempts = max_attempts
-        self.builder = AoTBuilder()
-        self.rule_factory = RuleFactory()
+        self.builder = builder or _DEFAULT_BUILDER
+        self.rule_factory = factory or _DEFAULT_FACTORY
+        self._feasible = {}  # config name -> {(rule_type, attribute): prune-feasible values}
         
-    def generate(self, config_name, rule_type=None):
+    def generate(self, config_name, rule_type=None, with_candidates=True):
         """Generate a puzzle with the specified configuration and rule type.
         
         Args:
             config_name: Name of the configuration to use
             rule_type: Optional rule type (random if None)
+            with_candidates: Whether to generate candidate answers; if False,
+                'candidates' and 'target' are None in the result
             
         Returns:
             Dictionary with puzzle data or None if generation failed
+            
+        Raises:
+            ValueError: If rule_type is not a known rule type
         """
         # Get configuration builder
         config_builder = self._get_config_builder(config_name)
         if not config_builder:
             return None
+        
+        # Only draw rules that the configuration can be pruned for
+        feasible = self._feasible_rules(config_name)
+        if rule_type is not None:
+            if rule_type not in _RULE_TYPES:
+                raise ValueError(f"Unknown rule type: {rule_type}")
+            feasible = {pair: values for pair, values in feasible.items() if pair[0] == rule_type}
+        if not feasible:
+            print(f"No feasible rules of type {rule_type} for configuration {config_name}")
+            return None
             
         # Try multiple attempts
         for attempt in range(self.max_attempts):
-            # Create a fresh rule
-            rule = self._create_rule(rule_type)
+            # Draw a fresh rule; attempts can fail for the drawn attribute and value
+            rule = self._draw_rule(feasible)
             rule_group = [[rule]]
             
             # Try to generate the puzzle
-            puzzle = self._try_generate_puzzle(config_builder, rule_group, config_name)
+            puzzle = self._try_generate_puzzle(config_builder, rule_group, config_name, with_candidates)
             if puzzle:
                 return puzzle
                 
         # Failed after max attempts
         return None
     
+    def generate_batch(self, specs, workers=None, seed=None):
+        """Generate several puzzles in parallel worker processes.
+        
+        Args:
+            specs: List of (config_name, rule_type) tuples; rule_type may be None
+            workers: Number of worker processes (all CPUs if None)
+            seed: Optional seed; every puzzle gets its own seed derived from it
+            
+        Returns:
+            List of puzzle dictionaries in the order of specs (None for failures)
+        """
+        workers = workers or os.cpu_count()
+        seeds = np.random.SeedSequence(seed).generate_state(len(specs))
+        tasks = [(config_name, rule_type, int(task_seed))
+                 for (config_name, rule_type), task_seed in zip(specs, seeds)]
+        chunksize = max(1, len(tasks) // (workers * 4))
+        
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(self.max_attempts,)) as executor:
+            return list(executor.map(_generate_worker, tasks, chunksize=chunksize))
+    
     def _get_config_builder(self, config_name):
         """Get the configuration builder function."""
         config_map = {
@@ -62,13 +114,70 @@ class PuzzleGenerator:
         }
         return config_map.get(config_name)
     
-    def _create_rule(self, rule_type=None):
-        """Create a fresh rule instance."""
+    def _feasible_rules(self, config_name):
+        """Get the rules the configuration can be pruned for.
+        
+        A rule is feasible if pruning succeeds with the rule applied to every
+        component. Computed once per configuration; the numpy random state is
+        restored afterwards so that generated puzzles do not depend on whether
+        the result was cached.
+        
+        Args:
+            config_name: Name of the configuration
+            
+        Returns:
+            Dict mapping (rule_type, attribute) to its list of feasible values;
+            pairs without any feasible value are left out
+        """
+        if config_name in self._feasible:
+            return self._feasible[config_name]
+        
+        config_builder = self._get_config_builder(config_name)
+        random_state = np.random.get_state()
+        try:
+            num_components = len(config_builder().children[0].children)
+            feasible = {}
+            for rule_type in _RULE_TYPES:
+                for attribute in _ATTRS:
+                    values = []
+                    for value in self.rule_factory.value_choices(rule_type):
+                        rule = self._create_rule(rule_type, attribute, value=value)
+                        if config_builder().prune([[rule]] * num_components) is not None:
+                            values.append(value)
+                    if values:
+                        feasible[(rule_type, attribute)] = values
+        finally:
+            np.random.set_state(random_state)
+        
+        self._feasible[config_name] = feasible
+        return feasible
+    
+    def _draw_rule(self, feasible):
+        """Create a rule with a random feasible rule type, then attribute, then value."""
+        rule_types = [rule_type for rule_type in _RULE_TYPES
+                      if any(pair[0] == rule_type for pair in feasible)]
+        rule_type = random.choice(rule_types)
+        attributes = [attribute for attribute in _ATTRS if (rule_type, attribute) in feasible]
+        attribute = random.choice(attributes)
+        value = random.choice(feasible[(rule_type, attribute)])
+        return self._create_rule(rule_type, attribute, value=value)
+    
+    def _create_rule(self, rule_type=None, attribute=None, component_idx=0, value=None):
+        """Create a fresh rule instance.
+        
+        Rules are copied from prototypes memoized by the factory, so repeated
+        attempts do not go through full factory dispatch.
+        """
         if rule_type is None:
-            rule_type = random.choice(["Progression", "Constant", "Arithmetic", "DistributeThree"])
+            rule_type = _RULE_TYPES[random.randrange(len(_RULE_TYPES))]
             
-        attribute = random.choice(["Number", "Position", "Type", "Size", "Color"])
-        return self.rule_factory.create_rule(rule_type, attribute)
+        if attribute is None:
+            attribute = _ATTRS[random.randrange(len(_ATTRS))]
+        return self.rule_factory.create_from_config({
+            "type": rule_type,
+            "attr": attribute,
+            "parameters": {"component_idx": component_idx, "value": value}
+        })
     
     def _generate_candidates(self, answer_panel, rule_groups, num_candidates=7):
         """Generate candidate answers including distractors.
@@ -82,13 +191,11 @@ class PuzzleGenerator:
             tuple: (candidates, target_idx) where candidates is list of panels and 
                   target_idx is the index of correct answer
         """
-        from dataset.legacy.sampling import sample_attr_avail, sample_attr
-        
         # Get modifiable attributes for the answer panel
         modifiable_attr = sample_attr_avail(rule_groups, answer_panel)
         
         # Create list of candidates starting with correct answer
-        answer_AoT = copy.deepcopy(answer_panel)
+        answer_AoT = answer_panel.clone()
         candidates = [answer_AoT]
         
         # Generate distractor candidates
@@ -97,18 +204,24 @@ class PuzzleGenerator:
             component_idx, attr_name, min_level, max_level = sample_attr(modifiable_attr)
             
             # Create a new candidate by modifying the sampled attribute
-            candidate = copy.deepcopy(answer_AoT)
+            candidate = answer_AoT.clone()
             candidate.sample_new(component_idx, attr_name, min_level, max_level, answer_AoT)
             candidates.append(candidate)
         
-        # Shuffle candidates and track correct answer
-        correct_answer = candidates[0]
-        random.shuffle(candidates)
-        target_idx = candidates.index(correct_answer)
+        # Fisher-Yates shuffle (same draws as random.shuffle), tracking where
+        # the correct answer moves instead of searching for it afterwards
+        target_idx = 0
+        for i in range(len(candidates) - 1, 0, -1):
+            j = random.randrange(i + 1)
+            candidates[i], candidates[j] = candidates[j], candidates[i]
+            if target_idx == i:
+                target_idx = j
+            elif target_idx == j:
+                target_idx = i
         
         return candidates, target_idx
     
-    def _try_generate_puzzle(self, config_builder, rule_group, config_name):
+    def _try_generate_puzzle(self, config_builder, rule_group, config_name, with_candidates=True):
         """Attempt to generate a puzzle with pruning and sampling."""
 
         # Create additional rule group for multi-component configurations
@@ -117,15 +230,12 @@ class PuzzleGenerator:
             if len(rule_group) == 1:
                 # Add a second rule with a different attribute
                 first_rule = rule_group[0][0]
-                available_attrs = ["Number", "Position", "Type", "Size", "Color"]
-                available_attrs.remove(first_rule.attr)
-                second_attr = random.choice(available_attrs)
+                available_attrs = _OTHER_ATTRS[first_rule.attr]
+                second_attr = available_attrs[random.randrange(len(available_attrs))]
                 
-                # Create second rule of same type but different attribute
-                second_rule = self.rule_factory.create_rule(
-                    first_rule.name, 
-                    second_attr
-                )
+                # Create second rule of same type but different attribute,
+                # applied to the second component
+                second_rule = self._create_rule(first_rule.name, second_attr, component_idx=1)
                 
                 # Add the second rule group
                 rule_group.append([second_rule])
@@ -146,7 +256,9 @@ class PuzzleGenerator:
             panels = self._generate_panels(start_node, rule_group)
             
             # Generate candidate answers
-            candidates, target_idx = self._generate_candidates(answer_panel=panels[-1], rule_groups=rule_group)
+            candidates, target_idx = None, None
+            if with_candidates:
+                candidates, target_idx = self._generate_candidates(answer_panel=panels[-1], rule_groups=rule_group)
             
             # Package the result with all information
             return {
@@ -165,91 +277,58 @@ class PuzzleGenerator:
             return None
     
     def _generate_panels(self, start_node, rule_groups):
-        """Generate all panels for the 3x3 matrix."""
-        try:
-            # First row
-            row_1_1 = copy.deepcopy(start_node)
-            row_1_2 = copy.deepcopy(row_1_1)
-            row_1_3 = copy.deepcopy(row_1_1)
-            
-            # Apply rules for each component
-            for l in range(len(rule_groups)):
-                rule_group = rule_groups[l]
-                rule = rule_group[0]  # Get the primary rule
-                
-                # Apply the rule to generate panel 2
-                if l == 0:
-                    row_1_2 = rule.apply_rule(row_1_1)
-                else:
-                    # For subsequent components, merge the result
-                    temp = rule.apply_rule(row_1_1)
-                    self._merge_component(row_1_2, temp, l)
-                
-                # Apply the rule to generate panel 3
-                if l == 0:
-                    row_1_3 = rule.apply_rule(row_1_2)
-                else:
-                    temp = rule.apply_rule(row_1_2)
-                    self._merge_component(row_1_3, temp, l)
-            
-            # Second row (variation of first row)
-            row_2_1 = copy.deepcopy(start_node)
-            row_2_1.resample(True)  # Create variation
-            row_2_2 = copy.deepcopy(row_2_1)
-            row_2_3 = copy.deepcopy(row_2_1)
-            
-            # Apply rules for each component
-            for l in range(len(rule_groups)):
-                rule_group = rule_groups[l]
-                rule = rule_group[0]
-                
-                if l == 0:
-                    row_2_2 = rule.apply_rule(row_2_1)
-                else:
-                    temp = rule.apply_rule(row_2_1)
-                    self._merge_component(row_2_2, temp, l)
-                    
-                if l == 0:
-                    row_2_3 = rule.apply_rule(row_2_2)
-                else:
-                    temp = rule.apply_rule(row_2_2)
-                    self._merge_component(row_2_3, temp, l)
-            
-            # Third row (another variation)
-            row_3_1 = copy.deepcopy(start_node)
-            row_3_1.resample(True)  # Create second variation
-            row_3_2 = copy.deepcopy(row_3_1)
-            row_3_3 = copy.deepcopy(row_3_1)
-            
-            # Apply rules for each component
-            for l in range(len(rule_groups)):
-                rule_group = rule_groups[l]
-                rule = rule_group[0]
-                
-                if l == 0:
-                    row_3_2 = rule.apply_rule(row_3_1)
-                else:
-                    temp = rule.apply_rule(row_3_1)
-                    self._merge_component(row_3_2, temp, l)
-                    
-                if l == 0:
-                    row_3_3 = rule.apply_rule(row_3_2)
+        """Generate all panels for the 3x3 matrix in row-major order."""
+        # Identity rules leave panels unchanged, so the clones made for
+        # each column already hold their result
+        active_rules = [(component_idx, rule_group[0])
+                        for component_idx, rule_group in enumerate(rule_groups)
+                        if not rule_group[0].is_identity()]
+        
+        panels = []
+        for row in range(3):
+            first = start_node.clone()
+            if row > 0:
+                first.resample(True)  # Rows 2 and 3 are variations of the first row
+            panels.append(first)
+            for col in range(1, 3):
+                if active_rules:
+                    panels.append(self._apply_rules(active_rules, panels[-1]))
                 else:
-                    temp = rule.apply_rule(row_3_2)
-                    self._merge_component(row_3_3, temp, l)
-            
-            return [row_1_1, row_1_2, row_1_3, 
-                    row_2_1, row_2_2, row_2_3, 
-                    row_3_1, row_3_2, row_3_3]
-        except Exception as e:
-            print(f"Error generating panels: {e}")
-            raise
+                    panels.append(first.clone())
+        return panels
     
-    def _merge_component(self, dst_aot, src_aot, component_idx):
-        """Merge a component from src_aot into dst_aot."""
-        try:
-            src_component = src_aot.children[0].children[component_idx]
-            dst_aot.children[0].children[component_idx] = src_component
-        except Exception as e:
-            print(f"Error merging component {component_idx}: {e}")
-            # If merge fails, don't modify the destination
+    def _apply_rules(self, rules, source):
+        """Generate the next panel in a row from the source panel.
+        
+        The source is cloned once and every rule writes its own component
+        of the clone in place, so no per-rule temporaries are needed.
+        
+        Args:
+            rules: (component_idx, rule) pairs to apply
+            source: Panel in the previous column
+            
+        Returns:
+            The next panel
+        """
+        target = source.clone()
+        for component_idx, rule in rules:
+            target = rule.apply_rule_component(source, component_idx, target)
+        return target
+
+
+# Generator owned by each worker process of generate_batch
+_worker_generator = None
+
+
+def _init_worker(max_attempts):
+    """Create the generator used by a worker process."""
+    global _worker_generator
+    _worker_generator = PuzzleGenerator(max_attempts=max_attempts)
+
+
+def _generate_worker(task):
+    """Generate one puzzle in a worker process with its own seed."""
+    config_name, rule_type, seed = task
+    random.seed(seed)
+    np.random.seed(seed)
+    return _worker_generator.generate(config_name, rule_type)
@@ -1,29 +1,24 @@
-import copy
+from dataset.core.rules.base import Rule
 from dataset.core.handlers.angle_handler import AngleHandler
-from dataset.core.operations.angle_operations import AngleAddition, AngleSubtraction
-from dataset.legacy.const import ANGLE_VALUES
+from dataset.core.operations.angle_operations import ANGLE_ADD, ANGLE_SUB
 
-class AngleRule:
+class AngleRule(Rule):
     """Rule specifically for angle rotation"""
     
     def __init__(self, value=1, component_idx=0):
         """Initialize with rotation value and component index"""
-        self.value = value
-        self.component_idx = component_idx
         self.handler = AngleHandler()
-        self.operation = AngleAddition() if value > 0 else AngleSubtraction()
+        self.operation = ANGLE_ADD if value > 0 else ANGLE_SUB
+        super().__init__(attr="Angle", value=value, component_idx=component_idx)
+    
+    def reset(self):
+        """Reset the per-matrix state accumulated by apply()"""
         self.state = {"memory": None}
-        self.attr = "Angle"  # For compatibility with existing code
-        self.name = "Angle" # For compatibility with existing code
-        
-    def apply_rule(self, source, target=None):
-        """Apply angle rotation rule (compatible with existing interface)"""
-        return self.apply(source, target)
         
     def apply(self, source, target=None):
         """Apply angle rotation to generate next panel"""
         if target is None:
-            target = copy.deepcopy(source)
+            target = source.clone()
             
         source_layout = self._get_layout(source)
         target_layout = self._get_layout(target)
@@ -34,8 +29,8 @@ class AngleRule:
             self.state["memory"] = first_value
             
             # For angles, we don't need to adjust constraints
-            # Just set a new angle directly
-            new_angle = (first_value + self.value) % len(ANGLE_VALUES)
+            # Just rotate by the rule's value, in the direction of the operation
+            new_angle = self.operation.apply(first_value, abs(self.value))
             self.handler.set_value(target_layout, new_angle)
         
         # Second application: calculate from memory and apply
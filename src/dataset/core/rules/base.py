@@ -15,6 +15,10 @@ class Rule(ABC):
         self.attr = attr
         self.value = value
         self.component_idx = component_idx
+        self.reset()
+
+    def reset(self):
+        """Reset the per-matrix state accumulated by apply()."""
         self.state = {}
     
     @abstractmethod
@@ -29,6 +33,44 @@ class Rule(ABC):
     def apply_rule(self, source, target=None):
         """Legacy compatibility method - forwards to apply()."""
         return self.apply(source, target)
+
+    def apply_rule_component(self, source_panel, component_idx, target_panel):
+        """Apply this rule to one component of a pre-allocated target panel.
+        
+        Only the given component of target_panel is written, so a panel with
+        several components can be built in place without a temporary panel
+        per rule.
+        
+        Args:
+            source_panel: Panel to apply the rule from
+            component_idx: Component to write, must be the rule's component
+            target_panel: Panel to write the result into
+            
+        Returns:
+            The target panel
+            
+        Raises:
+            IndexError: If either panel has no such component
+            ValueError: If the rule applies to a different component
+        """
+        num_components = min(len(source_panel.children[0].children),
+                             len(target_panel.children[0].children))
+        if not 0 <= component_idx < num_components:
+            raise IndexError(f"Component not found at index {component_idx}")
+        if component_idx != self.component_idx:
+            raise ValueError(f"Rule applies to component {self.component_idx}, not {component_idx}")
+        return self.apply(source_panel, target_panel)
+
+    def is_identity(self):
+        """Whether applying this rule leaves the panel unchanged.
+        
+        Identity rules can be skipped by the panel generator, since a copy
+        of the source panel already is their result.
+        
+        Returns:
+            True if apply() is a no-op on the source panel
+        """
+        return False
     
     @property
     def name(self):
@@ -1,14 +1,30 @@
 from dataset.core.rules.base import Rule
-import copy
 
 class ConstantRule(Rule):
     """Rule that maintains attributes unchanged between panels."""
     
-    def __init__(self, attr):
-        super().__init__(attr=attr)
+    def __init__(self, attr, component_idx=0):
+        super().__init__(attr=attr, component_idx=component_idx)
     
     def apply(self, source, target=None):
-        """Apply constant rule (no change)."""
+        """Apply constant rule (no change).
+        
+        Without a target, a clone of the source is returned rather than the
+        source itself, since callers go on to write other rules into it.
+        """
         if target is None:
-            return copy.deepcopy(source)
+            return source.clone()
         return target
+
+    def is_identity(self):
+        """Whether this constant rule leaves the panel unchanged.
+        
+        Always true: apply() returns the target as is for every attribute,
+        so unlike a progression it never resamples positions on Number or
+        Position. Each panel in a row starts as a copy of the previous one,
+        which already keeps the attribute constant.
+        
+        Returns:
+            True
+        """
+        return True
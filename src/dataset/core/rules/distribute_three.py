@@ -1,7 +1,18 @@
 from dataset.core.rules.base import Rule
-import copy
+import random
 import numpy as np
 
+# Column order of the three values in each row; rows 2-3 cycle one way or the other
+_ROW_PATTERNS_A = np.array([[0, 1, 2], [1, 2, 0], [2, 0, 1]])
+_ROW_PATTERNS_B = np.array([[0, 1, 2], [2, 0, 1], [1, 2, 0]])
+
+
+def _set_entity_levels(layout, attr_name, value_level):
+    """Set the same value level of an entity attribute on all entities of a layout."""
+    for entity in layout.children:
+        getattr(entity, attr_name).set_value_level(value_level)
+
+
 class DistributeThreeRule(Rule):
     """Ternary operator where three values across columns form a fixed set.
     
@@ -9,13 +20,19 @@ class DistributeThreeRule(Rule):
     the matrix in a specific pattern, cycling through rows.
     """
     
-    def __init__(self, attr):
+    def __init__(self, attr, component_idx=0):
         """Initialize a distribute three rule.
         
         Args:
             attr: Attribute to distribute (Number, Position, Type, Size, Color)
+            component_idx: Index of the component this rule applies to
         """
-        super().__init__(attr=attr)
+        if attr not in self._APPLY_ATTR:
+            raise ValueError(f"Unsupported attribute: {attr}")
+        super().__init__(attr=attr, component_idx=component_idx)
+
+    def reset(self):
+        """Reset the per-matrix state accumulated by apply()."""
         self.state = {
             "value_levels": [],  # Stores the three values for each row
             "count": 0           # Tracks application count for sequencing
@@ -32,210 +49,127 @@ class DistributeThreeRule(Rule):
             Modified panel after rule application
         """
         if target is None:
-            target = copy.deepcopy(source)
+            target = source.clone()
             
         current_layout = source.children[0].children[self.component_idx].children[0]
         second_layout = target.children[0].children[self.component_idx].children[0]
         
-        # Handle attribute-specific distribution logic
-        if self.attr == "Number":
-            if self.state["count"] == 0:
-                # First application: select three distinct values
-                all_value_levels = list(range(
-                    current_layout.layout_constraint["Number"][0], 
-                    current_layout.layout_constraint["Number"][1] + 1
-                ))
-                current_value_level = current_layout.number.get_value_level()
-                idx = all_value_levels.index(current_value_level)
-                all_value_levels.pop(idx)
-                
-                # Randomly select two more values
-                three_value_levels = np.random.choice(all_value_levels, 2, False)
-                three_value_levels = np.insert(three_value_levels, 0, current_value_level)
-                
-                # Set up value patterns for all rows
-                self._setup_value_patterns(three_value_levels)
-                
-                # Apply to the second panel
-                second_layout.number.set_value_level(self.state["value_levels"][0][1])
-            else:
-                # Handle subsequent applications
-                row, col = divmod(self.state["count"], 2)
-                if col == 0:
-                    # First column of a new row
-                    current_layout.number.set_value_level(self.state["value_levels"][row][0])
-                    current_layout.resample()
-                    # Create a new second layout reflecting the change
-                    target = copy.deepcopy(source)
-                    second_layout = target.children[0].children[self.component_idx].children[0]
-                    second_layout.number.set_value_level(self.state["value_levels"][row][1])
-                else:
-                    # Third column
-                    second_layout.number.set_value_level(self.state["value_levels"][row][2])
+        self._APPLY_ATTR[self.attr](self, source, target, current_layout, second_layout)
             
-            # Update positions and entities based on number
-            second_layout.position.sample(second_layout.number.get_value())
-            pos = second_layout.position.get_value()
-            del second_layout.children[:]
-            for i in range(len(pos)):
-                entity = copy.deepcopy(current_layout.children[0])
-                entity.name = str(i)
-                entity.bbox = pos[i]
-                if not current_layout.uniformity.get_value():
-                    entity.resample()
-                second_layout.insert(entity)
-                
-        elif self.attr == "Position":
-            if self.state["count"] == 0:
-                # First application: select three distinct position patterns
-                num = current_layout.number.get_value()
-                pos_0 = current_layout.position.get_value_idx()
-                pos_1 = current_layout.position.sample_new(num)
-                pos_2 = current_layout.position.sample_new(num, [pos_1])
-                
-                three_value_levels = np.array([pos_0, pos_1, pos_2])
-                self._setup_value_patterns(three_value_levels)
-                
-                # Apply to the second panel
-                second_layout.position.set_value_idx(self.state["value_levels"][0][1])
-            else:
-                # Handle subsequent applications
-                row, col = divmod(self.state["count"], 2)
-                if col == 0:
-                    # First column of a new row
-                    current_layout.number.set_value_level(len(self.state["value_levels"][row][0]) - 1)
-                    current_layout.resample()
-                    current_layout.position.set_value_idx(self.state["value_levels"][row][0])
-                    
-                    # Update entity positions
-                    pos = current_layout.position.get_value()
-                    for i in range(len(pos)):
-                        entity = current_layout.children[i]
-                        entity.bbox = pos[i]
-                    
-                    # Create a new second layout reflecting the change
-                    target = copy.deepcopy(source)
-                    second_layout = target.children[0].children[self.component_idx].children[0]
-                    second_layout.position.set_value_idx(self.state["value_levels"][row][1])            
-                else:
-                    # Third column
-                    second_layout.position.set_value_idx(self.state["value_levels"][row][2])
+        # Update application counter (cycles through 6 states for 3 rows x 2 columns)
+        self.state["count"] = (self.state["count"] + 1) % 6
+        
+        return target
+    
+    def _apply_number(self, source, target, current_layout, second_layout):
+        """Distribute three Number values across the row."""
+        if self.state["count"] == 0:
+            # First application: select three distinct values
+            current_value_level = current_layout.number.get_value_level()
             
-            # Update entity positions
-            pos = second_layout.position.get_value()
-            for i in range(len(pos)):
-                entity = second_layout.children[i]
-                entity.bbox = pos[i]
-                
-        elif self.attr == "Type":
-            if self.state["count"] == 0:
-                # First application: select three distinct type values
-                all_value_levels = range(
-                    current_layout.entity_constraint["Type"][0], 
-                    current_layout.entity_constraint["Type"][1] + 1
-                )
-                three_value_levels = np.random.choice(list(all_value_levels), 3, False)
-                np.random.shuffle(three_value_levels)
-                
-                self._setup_value_patterns(three_value_levels)
-                
-                # Apply to current and second panel
-                for entity in current_layout.children:
-                    entity.type.set_value_level(self.state["value_levels"][0][0])
-                for entity in second_layout.children:
-                    entity.type.set_value_level(self.state["value_levels"][0][1])
+            # Randomly select two more values from the range without the
+            # current one, shifting levels past it up by one
+            other_value_levels = random.sample(range(
+                current_layout.layout_constraint["Number"][0], 
+                current_layout.layout_constraint["Number"][1]
+            ), 2)
+            three_value_levels = np.array([current_value_level] + 
+                                          [level + (level >= current_value_level) for level in other_value_levels])
+            
+            # Set up value patterns for all rows
+            self._setup_value_patterns(three_value_levels)
+            
+            # Apply to the second panel
+            second_layout.number.set_value_level(self.state["value_levels"][0, 1])
+        else:
+            # Handle subsequent applications
+            row, col = divmod(self.state["count"], 2)
+            if col == 0:
+                # First column of a new row
+                current_layout.number.set_value_level(self.state["value_levels"][row, 0])
+                current_layout.resample()
+                # Refresh this component of the target to reflect the change
+                component = source.children[0].children[self.component_idx].clone()
+                target.children[0].children[self.component_idx] = component
+                second_layout = component.children[0]
+                second_layout.number.set_value_level(self.state["value_levels"][row, 1])
             else:
-                # Handle subsequent applications
-                row, col = divmod(self.state["count"], 2)
-                if col == 0:
-                    # First column of a new row
-                    value_level = self.state["value_levels"][row][0]
-                    for entity in current_layout.children:
-                        entity.type.set_value_level(value_level)
-                    
-                    value_level = self.state["value_levels"][row][1]
-                    for entity in second_layout.children:
-                        entity.type.set_value_level(value_level)
-                else:
-                    # Third column
-                    value_level = self.state["value_levels"][row][2]
-                    for entity in second_layout.children:
-                        entity.type.set_value_level(value_level)
-                        
-        elif self.attr == "Size":
-            if self.state["count"] == 0:
-                # First application: select three distinct size values
-                all_value_levels = range(
-                    current_layout.entity_constraint["Size"][0], 
-                    current_layout.entity_constraint["Size"][1] + 1
-                )
-                three_value_levels = np.random.choice(list(all_value_levels), 3, False)
+                # Third column
+                second_layout.number.set_value_level(self.state["value_levels"][row, 2])
+        
+        # Update positions and entities based on number
+        second_layout.position.sample(second_layout.number.get_value())
+        second_layout.rebuild_entities(current_layout.children[0], not current_layout.uniformity.get_value())
+    
+    def _apply_position(self, source, target, current_layout, second_layout):
+        """Distribute three Position values across the row."""
+        if self.state["count"] == 0:
+            # First application: select three distinct position patterns
+            num = current_layout.number.get_value()
+            pos_0 = current_layout.position.get_value_idx()
+            pos_1, pos_2 = current_layout.position.sample_k_new(num, 2)
+            
+            three_value_levels = np.array([pos_0, pos_1, pos_2])
+            self._setup_value_patterns(three_value_levels)
+            
+            # Apply to the second panel
+            second_layout.position.set_value_idx(self.state["value_levels"][0, 1])
+        else:
+            # Handle subsequent applications
+            row, col = divmod(self.state["count"], 2)
+            if col == 0:
+                # First column of a new row
+                current_layout.number.set_value_level(len(self.state["value_levels"][row, 0]) - 1)
+                current_layout.resample()
+                current_layout.position.set_value_idx(self.state["value_levels"][row, 0])
                 
-                self._setup_value_patterns(three_value_levels)
+                # Update entity positions
+                for entity, bbox in zip(current_layout.children, current_layout.position.get_value()):
+                    entity.bbox = bbox
                 
-                # Apply to current and second panel
-                for entity in current_layout.children:
-                    entity.size.set_value_level(self.state["value_levels"][0][0])
-                for entity in second_layout.children:
-                    entity.size.set_value_level(self.state["value_levels"][0][1])
+                # Refresh this component of the target to reflect the change
+                component = source.children[0].children[self.component_idx].clone()
+                target.children[0].children[self.component_idx] = component
+                second_layout = component.children[0]
+                second_layout.position.set_value_idx(self.state["value_levels"][row, 1])            
             else:
-                # Handle subsequent applications
-                row, col = divmod(self.state["count"], 2)
-                if col == 0:
-                    # First column of a new row
-                    value_level = self.state["value_levels"][row][0]
-                    for entity in current_layout.children:
-                        entity.size.set_value_level(value_level)
-                    
-                    value_level = self.state["value_levels"][row][1]
-                    for entity in second_layout.children:
-                        entity.size.set_value_level(value_level)
-                else:
-                    # Third column
-                    value_level = self.state["value_levels"][row][2]
-                    for entity in second_layout.children:
-                        entity.size.set_value_level(value_level)
-                        
-        elif self.attr == "Color":
-            if self.state["count"] == 0:
-                # First application: select three distinct color values
-                all_value_levels = range(
-                    current_layout.entity_constraint["Color"][0], 
-                    current_layout.entity_constraint["Color"][1] + 1
-                )
-                three_value_levels = np.random.choice(list(all_value_levels), 3, False)
-                
-                self._setup_value_patterns(three_value_levels)
+                # Third column
+                second_layout.position.set_value_idx(self.state["value_levels"][row, 2])
+        
+        # Update entity positions
+        for entity, bbox in zip(second_layout.children, second_layout.position.get_value()):
+            entity.bbox = bbox
+    
+    def _apply_entity_attr(self, source, target, current_layout, second_layout):
+        """Distribute three Type, Size or Color values across the row."""
+        attr_name = self.attr.lower()
+        if self.state["count"] == 0:
+            # First application: select three distinct values
+            all_value_levels = range(
+                current_layout.entity_constraint[self.attr][0], 
+                current_layout.entity_constraint[self.attr][1] + 1
+            )
+            three_value_levels = np.array(random.sample(all_value_levels, 3))
+            
+            self._setup_value_patterns(three_value_levels)
+            
+            # Apply to current and second panel
+            _set_entity_levels(current_layout, attr_name, self.state["value_levels"][0, 0])
+            _set_entity_levels(second_layout, attr_name, self.state["value_levels"][0, 1])
+        else:
+            # Handle subsequent applications
+            row, col = divmod(self.state["count"], 2)
+            if col == 0:
+                # First column of a new row
+                value_level = self.state["value_levels"][row, 0]
+                _set_entity_levels(current_layout, attr_name, value_level)
                 
-                # Apply to current and second panel
-                for entity in current_layout.children:
-                    entity.color.set_value_level(self.state["value_levels"][0][0])
-                for entity in second_layout.children:
-                    entity.color.set_value_level(self.state["value_levels"][0][1])
+                value_level = self.state["value_levels"][row, 1]
+                _set_entity_levels(second_layout, attr_name, value_level)
             else:
-                # Handle subsequent applications
-                row, col = divmod(self.state["count"], 2)
-                if col == 0:
-                    # First column of a new row
-                    value_level = self.state["value_levels"][row][0]
-                    for entity in current_layout.children:
-                        entity.color.set_value_level(value_level)
-                    
-                    value_level = self.state["value_levels"][row][1]
-                    for entity in second_layout.children:
-                        entity.color.set_value_level(value_level)
-                else:
-                    # Third column
-                    value_level = self.state["value_levels"][row][2]
-                    for entity in second_layout.children:
-                        entity.color.set_value_level(value_level)
-        else:
-            raise ValueError(f"Unsupported attribute: {self.attr}")
-            
-        # Update application counter (cycles through 6 states for 3 rows x 2 columns)
-        self.state["count"] = (self.state["count"] + 1) % 6
-        
-        return target
+                # Third column
+                value_level = self.state["value_levels"][row, 2]
+                _set_entity_levels(second_layout, attr_name, value_level)
     
     def _setup_value_patterns(self, three_value_levels):
         """Set up the patterns of values for all rows.
@@ -243,14 +177,16 @@ class DistributeThreeRule(Rule):
         Args:
             three_value_levels: Array of three values to distribute
         """
-        # First row always uses original order
-        self.state["value_levels"] = []
-        self.state["value_levels"].append(three_value_levels[[0, 1, 2]])
-        
-        # Randomly choose between two possible cycling patterns for rows 2-3
-        if np.random.uniform() >= 0.5:
-            self.state["value_levels"].append(three_value_levels[[1, 2, 0]])
-            self.state["value_levels"].append(three_value_levels[[2, 0, 1]])
-        else:
-            self.state["value_levels"].append(three_value_levels[[2, 0, 1]])
-            self.state["value_levels"].append(three_value_levels[[1, 2, 0]])
+        # First row always uses original order, then randomly choose
+        # between two possible cycling patterns for rows 2-3
+        patterns = _ROW_PATTERNS_A if random.random() >= 0.5 else _ROW_PATTERNS_B
+        self.state["value_levels"] = three_value_levels[patterns]
+    
+    # Per-attribute implementations of apply(), keyed by attribute name
+    _APPLY_ATTR = {
+        "Number": _apply_number,
+        "Position": _apply_position,
+        "Type": _apply_entity_attr,
+        "Size": _apply_entity_attr,
+        "Color": _apply_entity_attr
+    }
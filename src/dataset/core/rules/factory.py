@@ -2,8 +2,28 @@ from dataset.core.rules.progression import ProgressionRule
 from dataset.core.rules.constant import ConstantRule
 from dataset.core.rules.arithmetic import ArithmeticRule
 from dataset.core.rules.distribute_three import DistributeThreeRule
+import copy
+import functools
 import random
 
+_RULE_CLASSES = {
+    "Progression": ProgressionRule,
+    "Constant": ConstantRule,
+    "Arithmetic": ArithmeticRule,
+    "DistributeThree": DistributeThreeRule
+}
+
+
+@functools.lru_cache(maxsize=256)
+def _build_rule(rule_type, attribute, params):
+    """Instantiate a rule prototype, cached per (type, attribute, parameters).
+    
+    Prototypes are never applied directly; callers get a fresh copy with
+    its own state, since rules accumulate state across a matrix.
+    """
+    return _RULE_CLASSES[rule_type](attr=attribute, **dict(params))
+
+
 class RuleFactory:
     """Factory for creating rule instances."""
     
@@ -18,37 +38,63 @@ class RuleFactory:
         Returns:
             Rule instance
         """
-        rule_map = {
-            "Progression": self._create_progression_rule,
-            "Constant": self._create_constant_rule,
-            "Arithmetic": self._create_arithmetic_rule,
-            "DistributeThree": self._create_distribute_three_rule
-        }
-        
-        creator = rule_map.get(rule_type)
-        if not creator:
-            raise ValueError(f"Unknown rule type: {rule_type}")
-            
-        return creator(attribute, **kwargs)
+        return self.create_from_config({"type": rule_type, "attr": attribute, "parameters": kwargs})
     
-    def _create_progression_rule(self, attribute, **kwargs):
-        """Create a progression rule."""
-        value = kwargs.get('value')
-        if value is None:
-            value = random.randint(-1, 1)  # Default progression values
-        return ProgressionRule(attr=attribute, value=value)
-    
-    def _create_constant_rule(self, attribute, **kwargs):
-        """Create a constant rule."""
-        return ConstantRule(attr=attribute)
+    def create_from_config(self, rule_config):
+        """Create a rule instance from a config dictionary.
+        
+        Rules with the same type, attribute and parameters are built once and
+        copied afterwards. A missing value is sampled before the lookup, so
+        repeated calls still draw fresh random values.
+        
+        Args:
+            rule_config: Dict with 'type', 'attr' and optional 'parameters'
+        
+        Returns:
+            Rule instance with fresh state
+        """
+        rule_type = rule_config["type"]
+        if rule_type not in _RULE_CLASSES:
+            raise ValueError(f"Unknown rule type: {rule_type}")
+        
+        params = dict(rule_config.get("parameters") or {})
+        if params.get("value") is None:
+            params.pop("value", None)
+            value = self.sample_value(rule_type)
+            if value is not None:
+                params["value"] = value
+        
+        prototype = _build_rule(rule_type, rule_config["attr"], tuple(sorted(params.items())))
+        rule = copy.copy(prototype)
+        rule.reset()
+        return rule
     
-    def _create_arithmetic_rule(self, attribute, **kwargs):
-        """Create an arithmetic rule."""
-        value = kwargs.get('value')
-        if value is None:
-            value = random.choice([-2, -1, 0, 1, 2])  # Default arithmetic values
-        return ArithmeticRule(attr=attribute, value=value)
+    def value_choices(self, rule_type):
+        """Get the values sample_value() can draw for a rule type.
+        
+        Args:
+            rule_type: Type of rule ('Progression', 'Arithmetic', etc.)
+            
+        Returns:
+            Tuple of possible values, (None,) if the rule type takes no value
+        """
+        if rule_type == "Progression":
+            return (-1, 0, 1)
+        if rule_type == "Arithmetic":
+            return (-2, -1, 0, 1, 2)
+        return (None,)
     
-    def _create_distribute_three_rule(self, attribute, **kwargs):
-        """Create a distribute three rule."""
-        return DistributeThreeRule(attr=attribute)
+    def sample_value(self, rule_type):
+        """Sample a default value for rule types that take one.
+        
+        Args:
+            rule_type: Type of rule ('Progression', 'Arithmetic', etc.)
+        
+        Returns:
+            Sampled value, or None if the rule type takes no value
+        """
+        if rule_type == "Progression":
+            return random.randint(-1, 1)  # Default progression values
+        if rule_type == "Arithmetic":
+            return random.choice([-2, -1, 0, 1, 2])  # Default arithmetic values
+        return None
@@ -1,4 +1,3 @@
-import copy
 from dataset.core.rules.base import Rule
 
 class ProgressionRule(Rule):
@@ -16,8 +15,13 @@ class ProgressionRule(Rule):
             value (int): The progression value (e.g., +1, -1)
             component_idx (int): The component to apply this rule to
         """
+        if attr not in self._APPLY_ATTR:
+            raise ValueError(f"Unsupported attribute: {attr}")
         super().__init__(attr, value, component_idx)
-        self.state["first_col"] = True  # Flag for tracking first application
+
+    def reset(self):
+        """Reset the per-matrix state accumulated by apply()."""
+        self.state = {"first_col": True}  # Flag for tracking first application
     
     def apply(self, source_panel, target_panel=None):
         """Apply progression to generate the next panel.
@@ -37,14 +41,7 @@ class ProgressionRule(Rule):
         target_layout = self._get_layout(target_panel)
         
         # Apply progression based on attribute type
-        if self.attr == "Number":
-            self._apply_to_number(source_layout, target_layout)
-        elif self.attr == "Position":
-            self._apply_to_position(target_layout)
-        elif self.attr in ["Type", "Size", "Color"]:
-            self._apply_to_entity_attribute(source_layout, target_layout, self.attr.lower())
-        else:
-            raise ValueError(f"Unsupported attribute: {self.attr}")
+        self._APPLY_ATTR[self.attr](self, source_layout, target_layout)
         
         # Toggle the first_col flag for the next application
         self.state["first_col"] = not self.state["first_col"]
@@ -53,6 +50,18 @@ class ProgressionRule(Rule):
     
     def apply_rule(self, source_panel, target_panel=None):
         return self.apply(source_panel, target_panel)
+
+    def is_identity(self):
+        """Whether this progression leaves the panel unchanged.
+        
+        Only a zero-step progression on Position is a true no-op: on Number
+        the positions are resampled, and on Type/Size/Color the value is
+        still made consistent across entities.
+        
+        Returns:
+            True if apply() is a no-op on the source panel
+        """
+        return self.attr == "Position" and self.value == 0
     
     def _apply_to_number(self, source_layout, target_layout):
         """Apply progression to the Number attribute.
@@ -66,26 +75,16 @@ class ProgressionRule(Rule):
         
         # Update position based on new number
         target_layout.position.sample(target_layout.number.get_value())
-        pos = target_layout.position.get_value()
-        
-        # Clear existing entities and create new ones
-        del target_layout.children[:]
-        for i in range(len(pos)):
-            # Copy the first entity from source and adjust its properties
-            entity = copy.deepcopy(source_layout.children[0])
-            entity.name = str(i)
-            entity.bbox = pos[i]
-            
-            # Resample entity attributes if not uniform
-            if not source_layout.uniformity.get_value():
-                entity.resample()
-                
-            target_layout.insert(entity)
+        
+        # Replace the entities with copies of the first source entity,
+        # resampling their attributes if not uniform
+        target_layout.rebuild_entities(source_layout.children[0], not source_layout.uniformity.get_value())
     
-    def _apply_to_position(self, target_layout):
+    def _apply_to_position(self, source_layout, target_layout):
         """Apply progression to the Position attribute.
         
         Args:
+            source_layout: The source layout node (unused, positions shift in place)
             target_layout: The target layout node to modify
         """
         # Calculate new position index
@@ -95,18 +94,17 @@ class ProgressionRule(Rule):
         target_layout.position.set_value_idx(second_pos_idx)
         
         # Update entity positions
-        second_bbox = target_layout.position.get_value()
-        for i in range(len(second_bbox)):
-            target_layout.children[i].bbox = second_bbox[i]
+        for entity, bbox in zip(target_layout.children, target_layout.position.get_value()):
+            entity.bbox = bbox
     
-    def _apply_to_entity_attribute(self, source_layout, target_layout, attr_name):
+    def _apply_to_entity_attribute(self, source_layout, target_layout):
         """Apply progression to an entity attribute (Type, Size, Color).
         
         Args:
             source_layout: The source layout node
             target_layout: The target layout node to modify
-            attr_name: The attribute name in lowercase
         """
+        attr_name = self.attr.lower()
         # Get current value level from first entity
         old_value_level = getattr(source_layout.children[0], attr_name).get_value_level()
         
@@ -118,6 +116,15 @@ class ProgressionRule(Rule):
         # Update the attribute for all entities in the target
         for entity in target_layout.children:
             getattr(entity, attr_name).set_value_level(old_value_level + self.value)
+    
+    # Per-attribute implementations of apply(), keyed by attribute name
+    _APPLY_ATTR = {
+        "Number": _apply_to_number,
+        "Position": _apply_to_position,
+        "Type": _apply_to_entity_attribute,
+        "Size": _apply_to_entity_attribute,
+        "Color": _apply_to_entity_attribute
+    }
 
     def _get_layout(self, panel):
         """Extract the layout node from a panel for the specified component.
@@ -141,5 +148,5 @@ class ProgressionRule(Rule):
             Target if not None, otherwise a copy of source
         """
         if target is None:
-            return copy.deepcopy(source)
+            return source.clone()
         return target
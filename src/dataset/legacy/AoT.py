@@ -12,10 +12,28 @@ from dataset.core.aot.operations.pruner import AoTPruner
 from dataset.core.aot.operations.sampler import AoTSampler
 
 
+def _clone_constraint(constraint, memo):
+    """Copy a constraint dict once per clone, so that a Layout and its Entities
+    keep sharing the same dict in the copy.
+    Arguments:
+        constraint(dict): attribute name -> [min, max] (or [pos_type, pos_list])
+        memo(dict): copies made so far, keyed by id of the original
+    Returns:
+        dict: the copied constraint
+    """
+    key = id(constraint)
+    if key not in memo:
+        memo[key] = {attr: list(bounds) for attr, bounds in constraint.items()}
+    return memo[key]
+
+
 class AoTNode(object):
     """Superclass of AoT. 
+    Nodes declare __slots__ since many of them are created per puzzle.
     """
 
+    __slots__ = ("name", "level", "node_type", "children", "is_pg")
+
     levels_next = {"Root": "Structure",
                    "Structure": "Component",
                    "Component": "Layout",
@@ -67,6 +85,36 @@ class AoTNode(object):
     def __str__(self):
         return self.level + "." + self.name
 
+    def clone(self, memo=None):
+        """Copy this node and its subtree. Faster than deepcopy as fields are
+        copied directly; constant value tables and position lists are shared.
+        Arguments:
+            memo(dict): constraint dicts copied so far, used internally
+        Returns:
+            AoTNode: an independent copy of this node
+        """
+        if memo is None:
+            memo = {}
+        new_node = object.__new__(type(self))
+        new_node.name = self.name
+        new_node.level = self.level
+        new_node.node_type = self.node_type
+        new_node.is_pg = self.is_pg
+        new_node.children = [child.clone(memo) for child in self.children]
+        return new_node
+
+    def __deepcopy__(self, memo):
+        """Route copy.deepcopy through clone(), so existing deepcopy callers
+        skip walking the constant value tables and position lists.
+        Arguments:
+            memo(dict): deepcopy memo, also used to share copied constraint dicts
+        Returns:
+            AoTNode: an independent copy of this node
+        """
+        new_node = self.clone(memo)
+        memo[id(self)] = new_node
+        return new_node
+
     def sample(self):
         """Sample a concrete AoT from this abstract AoT.
         
@@ -114,6 +162,8 @@ class AoTNode(object):
 
 class Root(AoTNode):
 
+    __slots__ = ()
+
     def __init__(self, name, is_pg=False):
         super(Root, self).__init__(name, level="Root", node_type="or", is_pg=is_pg)
     
@@ -175,6 +225,8 @@ class Root(AoTNode):
 
 class Structure(AoTNode):
 
+    __slots__ = ()
+
     def __init__(self, name, is_pg=False):
         super(Structure, self).__init__(name, level="Structure", node_type="and", is_pg=is_pg)
     
@@ -200,6 +252,8 @@ class Structure(AoTNode):
 
 class Component(AoTNode):
 
+    __slots__ = ()
+
     def __init__(self, name, is_pg=False):
         super(Component, self).__init__(name, level="Component", node_type="or", is_pg=is_pg)
 
@@ -227,6 +281,9 @@ class Layout(AoTNode):
     To copy a Layout, please use deepcopy such that newly instantiated and separated attributes are created.
     """
 
+    __slots__ = ("layout_constraint", "entity_constraint", "number", "position", "uniformity",
+                 "orig_layout_constraint", "orig_entity_constraint", "sample_new_num_count")
+
     def __init__(self, name, layout_constraint, entity_constraint, 
                              orig_layout_constraint=None, orig_entity_constraint=None, 
                              sample_new_num_count=None, is_pg=False):
@@ -256,6 +313,26 @@ class Layout(AoTNode):
         else:
             self.sample_new_num_count = sample_new_num_count
 
+    def rebuild_entities(self, template, resample):
+        """Replace all entities with clones of a template, one per sampled position.
+        Arguments:
+            template(Entity): the entity to clone
+            resample(bool): whether to resample the attributes of each clone
+        """
+        pos = self.position.get_value()
+        children = []
+        # Like sampled entities, the clones share this layout's entity_constraint:
+        # seeding the memo makes every clone use it instead of copying the template's
+        memo = {id(template.entity_constraint): self.entity_constraint}
+        for i in range(len(pos)):
+            entity = template.clone(memo)
+            entity.name = str(i)
+            entity.bbox = pos[i]
+            if resample:
+                entity.resample()
+            children.append(entity)
+        self.children = children
+
     def add_new(self, *bboxes):
         """Add new entities into this level.
         Arguments:
@@ -330,12 +407,42 @@ class Layout(AoTNode):
                                  self.orig_layout_constraint, self.orig_entity_constraint,
                                  self.sample_new_num_count)
 
+    def clone(self, memo=None):
+        if memo is None:
+            memo = {}
+        new_node = super(Layout, self).clone(memo)
+        new_node.layout_constraint = _clone_constraint(self.layout_constraint, memo)
+        new_node.entity_constraint = _clone_constraint(self.entity_constraint, memo)
+        new_node.number = self.number.clone()
+        new_node.position = self.position.clone()
+        new_node.uniformity = self.uniformity.clone()
+        # original constraints are never modified after construction
+        new_node.orig_layout_constraint = self.orig_layout_constraint
+        new_node.orig_entity_constraint = self.orig_entity_constraint
+        new_node.sample_new_num_count = {num: [count, list(sampled)]
+                                         for num, (count, sampled) in self.sample_new_num_count.items()}
+        return new_node
+
     def reset_constraint(self, attr):
         attr_name = attr.lower()
         instance = getattr(self, attr_name)
         instance.min_level = self.layout_constraint[attr][0]
         instance.max_level = self.layout_constraint[attr][1]
     
+    def reset_entity_constraint(self, attr, min_level, max_level):
+        """Reset an entity attribute constraint for all children at once.
+        Entities normally share the layout's entity_constraint, so the bounds
+        are written once and only the per-entity attribute levels are updated.
+        """
+        attr_name = attr.lower()
+        self.entity_constraint[attr][:] = [min_level, max_level]
+        for entity in self.children:
+            if entity.entity_constraint is not self.entity_constraint:
+                entity.entity_constraint[attr][:] = [min_level, max_level]
+            instance = getattr(entity, attr_name)
+            instance.min_level = min_level
+            instance.max_level = max_level
+    
     def _sample_new(self, attr_name, min_level, max_level, layout):
         if attr_name == "Number":
             while True:
@@ -386,6 +493,8 @@ class Layout(AoTNode):
 
 class Entity(AoTNode):
 
+    __slots__ = ("entity_constraint", "bbox", "type", "size", "color", "angle")
+
     def __init__(self, name, bbox, entity_constraint):
         super(Entity, self).__init__(name, level="Entity", node_type="leaf", is_pg=True)
         # Attributes
@@ -402,6 +511,18 @@ class Entity(AoTNode):
         self.angle = Angle(min_level=entity_constraint["Angle"][0], max_level=entity_constraint["Angle"][1])
         self.angle.sample()
     
+    def clone(self, memo=None):
+        if memo is None:
+            memo = {}
+        new_node = super(Entity, self).clone(memo)
+        new_node.entity_constraint = _clone_constraint(self.entity_constraint, memo)
+        new_node.bbox = self.bbox
+        new_node.type = self.type.clone()
+        new_node.size = self.size.clone()
+        new_node.color = self.color.clone()
+        new_node.angle = self.angle.clone()
+        return new_node
+    
     def reset_constraint(self, attr, min_level, max_level):
         attr_name = attr.lower()
         self.entity_constraint[attr][:] = [min_level, max_level]
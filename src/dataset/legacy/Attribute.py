@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 
 
+from math import comb
+
 import numpy as np
 
 from dataset.legacy.const import (ANGLE_MAX, ANGLE_MIN, ANGLE_VALUES, COLOR_MAX, COLOR_MIN,
@@ -36,6 +38,14 @@ class Attribute(object):
     def set_value(self):
         pass
     
+    def clone(self):
+        """Copy this attribute. The value set is shared, the memory is not.
+        """
+        new_attr = object.__new__(type(self))
+        new_attr.__dict__.update(self.__dict__)
+        new_attr.previous_values = list(self.previous_values)
+        return new_attr
+    
     def __repr__(self):
         return self.level + "." + self.name
     
@@ -324,6 +334,35 @@ class Position(Attribute):
                 break
         return new_value_idx
 
+    def sample_k_new(self, num, k, previous_values=None):
+        """Sample k new position patterns that differ from the current one,
+        the previous ones and each other. Equivalent to k chained sample_new
+        calls, but the set of seen patterns is built only once.
+        Arguments:
+            num(int): the number of positions in each pattern
+            k(int): the number of patterns to sample
+            previous_values(list of index arrays): patterns to exclude
+                (self.previous_values if empty)
+        Returns:
+            new_values(list of index arrays): k new patterns
+        """
+        length = len(self.values)
+        if not previous_values:
+            previous_values = self.previous_values
+        seen = {frozenset(self.value_idx.tolist())}
+        seen.update(frozenset(np.asarray(previous_value).tolist()) for previous_value in previous_values)
+        if comb(length, num) - sum(len(pattern) == num for pattern in seen) < k:
+            raise ValueError("Not enough position patterns to sample from")
+        new_values = []
+        while len(new_values) < k:
+            new_value_idx = np.random.choice(length, num, False)
+            pattern = frozenset(new_value_idx.tolist())
+            if pattern in seen:
+                continue
+            seen.add(pattern)
+            new_values.append(new_value_idx)
+        return new_values
+
     def sample_add(self, num):
         """Sample additional number of positions.
         Arguments:
@@ -339,6 +378,12 @@ class Position(Attribute):
             ret.append(self.values[index])
         return ret
     
+    def clone(self):
+        new_attr = super(Position, self).clone()
+        if self.value_idx is not None:
+            new_attr.value_idx = self.value_idx.copy()
+        return new_attr
+    
     def get_value_idx(self):
         return self.value_idx
     
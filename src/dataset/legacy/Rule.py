@@ -61,6 +61,21 @@ class Rule(object):
         # Root -> Structure -> Component -> Layout -> Entity
         pass
 
+    def apply_chain(self, aot, n_steps):
+        """Apply the rule repeatedly, each time to the previous result, e.g. to build a row.
+        Applications stay sequential: a rule keeps state across columns and Number/Position 
+        resample, so later panels cannot be computed in closed form.
+        Arguments:
+            aot(AoTNode): the first AoT of the chain
+            n_steps(int): number of AoTs to return, including the first one
+        Returns:
+            chain(list of AoTNode): the first AoT followed by the n_steps - 1 results
+        """
+        chain = [aot]
+        for _ in range(n_steps - 1):
+            chain.append(self.apply_rule(chain[-1]))
+        return chain
+
 
 class Constant(Rule):
     """Unary operator. Nothing changes.
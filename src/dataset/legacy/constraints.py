@@ -103,7 +103,8 @@ def rule_constraint(rule_list, num_min, num_max,
                         color_max = color_max - color_min
                     if rule.value < 0:
                         color_min = 2 * color_min
-        if rule.name == "Distribute_Three":
+        # DistributeThreeRule is named without the underscore
+        if rule.name in ("Distribute_Three", "DistributeThree"):
             # if less than 3 values, invalidate it
             if rule.attr == "Number":
                 if num_max - num_min + 1 < 3:
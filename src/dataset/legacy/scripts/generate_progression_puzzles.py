@@ -12,7 +12,7 @@ through command-line options.
 import os
 import sys
 import argparse
-import copy
+import functools
 import random
 import numpy as np
 import matplotlib.pyplot as plt
@@ -22,6 +22,7 @@ from matplotlib.gridspec import GridSpec
 from Rule import Rule_Wrapper
 from build_tree import build_distribute_four
 from rendering import render_panel
+from const import IMAGE_SIZE
 from serialize import serialize_rules, serialize_aot
 
 
@@ -112,42 +113,43 @@ def generate_puzzle(attr, value, seed=None):
     # Sample the tree to create the first panel
     start_node = new_root.sample()
     
-    # Generate the first row
-    row_1_1 = copy.deepcopy(start_node)
-    row_1_2 = progression_rule.apply_rule(row_1_1)
-    row_1_3 = progression_rule.apply_rule(row_1_2)
+    # Generate the rows; rows 2 and 3 are resampled to create variation,
+    # and the last panel of the third row is the answer
+    rows = []
+    for row in range(3):
+        first = start_node.clone()
+        if row > 0:
+            first.resample(True)
+        rows.append(generate_row(first, progression_rule, secondary_rule))
+    (row_1_1, row_1_2, row_1_3), (row_2_1, row_2_2, row_2_3), (row_3_1, row_3_2, row_3_3) = rows
     
-    if secondary_rule:
-        row_1_2 = secondary_rule.apply_rule(row_1_1, row_1_2)
-        row_1_3 = secondary_rule.apply_rule(row_1_2, row_1_3)
-    
-    # Generate the second row
-    row_2_1 = copy.deepcopy(start_node)
-    row_2_1.resample(True)  # Resample to create variation
-    row_2_2 = progression_rule.apply_rule(row_2_1)
-    row_2_3 = progression_rule.apply_rule(row_2_2)
+    # Create context (all panels except the answer)
+    context = [row_1_1, row_1_2, row_1_3, row_2_1, row_2_2, row_2_3, row_3_1, row_3_2]
     
-    if secondary_rule:
-        row_2_2 = secondary_rule.apply_rule(row_2_1, row_2_2)
-        row_2_3 = secondary_rule.apply_rule(row_2_2, row_2_3)
+    return context, row_3_3, rule_groups, secondary_attr if secondary_rule else None
+
+
+def generate_row(first_panel, progression_rule, secondary_rule=None):
+    """Generate a row of three panels from its first panel.
     
-    # Generate the third row (with answer)
-    row_3_1 = copy.deepcopy(start_node)
-    row_3_1.resample(True)
-    row_3_2 = progression_rule.apply_rule(row_3_1)
-    row_3_3 = progression_rule.apply_rule(row_3_2)  # This is the answer
+    Args:
+        first_panel (object): First panel of the row
+        progression_rule (Rule): Primary progression rule
+        secondary_rule (Rule, optional): Secondary progression rule
+        
+    Returns:
+        list: The three panels of the row
+    """
+    row = progression_rule.apply_chain(first_panel, 3)
     
     if secondary_rule:
-        row_3_2 = secondary_rule.apply_rule(row_3_1, row_3_2)
-        row_3_3 = secondary_rule.apply_rule(row_3_2, row_3_3)
-    
-    # Create context (all panels except the answer)
-    context = [row_1_1, row_1_2, row_1_3, row_2_1, row_2_2, row_2_3, row_3_1, row_3_2]
+        for col in range(1, 3):
+            row[col] = secondary_rule.apply_rule(row[col - 1], row[col])
     
-    return context, row_3_3, rule_groups, secondary_attr if secondary_rule else None
+    return row
 
 
-def visualize_puzzle(context, answer, output_file, rule_info):
+def visualize_puzzle(context, answer, output_file, rule_info, rendered=None):
     """Visualize a puzzle with its context and answer.
     
     Args:
@@ -155,55 +157,87 @@ def visualize_puzzle(context, answer, output_file, rule_info):
         answer (object): Answer panel
         output_file (str): Output filename
         rule_info (str): Information about the rules used
+        rendered (np.ndarray, optional): Images from render_puzzle(), rendered if not given
+    """
+    if rendered is None:
+        rendered = render_puzzle(context, answer)
+    
+    # Reuse the cached figure, only swapping the title and panel images;
+    # the empty panel before the answer is skipped
+    fig, title, images = _get_figure()
+    title.set_text(rule_info)
+    for image, panel_image in zip(images, list(rendered[:len(context)]) + [rendered[-1]]):
+        image.set_data(panel_image)
+        image.autoscale()
+    
+    fig.savefig(output_file, dpi=150)
+    
+    print(f"Puzzle visualization saved to {output_file}")
+
+
+@functools.lru_cache(maxsize=1)
+def _get_figure():
+    """Build the puzzle figure once, to be reused by every visualize_puzzle() call.
+    
+    Returns:
+        tuple: (figure, title text, images of the 8 context panels followed by the answer)
     """
     # Create a figure with a 3x3 grid
-    fig = plt.figure(figsize=(10, 10))
-    gs = GridSpec(4, 3, height_ratios=[1, 3, 3, 3])
+    # Margins are fixed and the figure is sized so the square panels fill
+    # their cells, so saving needs no extra pass to trim whitespace
+    fig = plt.figure(figsize=(9.2, 10))
+    gs = GridSpec(4, 3, height_ratios=[1, 3, 3, 3], left=0.02, right=0.98, bottom=0.02, top=0.98,
+                  wspace=0.05, hspace=0.05)
     
     # Add a title with rule information
     title_ax = fig.add_subplot(gs[0, :])
-    title_ax.text(0.5, 0.5, rule_info, ha='center', va='center', fontsize=12)
+    title = title_ax.text(0.5, 0.5, "", ha='center', va='center', fontsize=12)
     title_ax.axis('off')
     
-    # Render all context panels
-    for i, panel in enumerate(context):
+    # Add all panels, context panels in black and the answer in the bottom
+    # right marked with a red border
+    blank_panel = np.full((IMAGE_SIZE, IMAGE_SIZE), 255, np.uint8)
+    images = []
+    for i in range(9):
         row = (i // 3) + 1
         col = i % 3
         ax = fig.add_subplot(gs[row, col])
-        ax.imshow(render_panel(panel), cmap='gray')
+        images.append(ax.imshow(blank_panel, cmap='gray'))
         
-        # Add a black border around each panel
         for spine in ax.spines.values():
             spine.set_visible(True)
-            spine.set_color('black')
-            spine.set_linewidth(2)
+            spine.set_color('red' if i == 8 else 'black')
+            spine.set_linewidth(3 if i == 8 else 2)
             
         ax.axis('on')
         ax.set_xticks([])
         ax.set_yticks([])
     
-    # Render the answer in the bottom right
-    ax = fig.add_subplot(gs[3, 2])
-    ax.imshow(render_panel(answer), cmap='gray')
-    
-    # Mark the answer position with a red border
-    for spine in ax.spines.values():
-        spine.set_visible(True)
-        spine.set_color('red')
-        spine.set_linewidth(3)
-    
-    ax.axis('on')
-    ax.set_xticks([])
-    ax.set_yticks([])
-    
-    plt.tight_layout()
-    plt.savefig(output_file, dpi=150, bbox_inches='tight')
-    plt.close()
+    return fig, title, images
+
+
+def render_puzzle(context, answer):
+    """Render all panels of a puzzle once, for both visualization and saving.
     
-    print(f"Puzzle visualization saved to {output_file}")
+    Args:
+        context (list): List of context panels
+        answer (object): Answer panel
+        
+    Returns:
+        np.ndarray: Preallocated stack of the context panels, an empty panel
+            for the answer position, then the answer at the end
+    """
+    first_image = render_panel(context[0])
+    all_images = np.empty((len(context) + 2,) + first_image.shape, dtype=first_image.dtype)
+    all_images[0] = first_image
+    for i in range(1, len(context)):
+        all_images[i] = render_panel(context[i])
+    all_images[len(context)] = 0
+    all_images[len(context) + 1] = render_panel(answer)
+    return all_images
 
 
-def save_puzzle_data(context, answer, rule_groups, output_base):
+def save_puzzle_data(context, answer, rule_groups, output_base, rendered=None):
     """Save puzzle data in NPZ format.
     
     Args:
@@ -211,14 +245,9 @@ def save_puzzle_data(context, answer, rule_groups, output_base):
         answer (object): Answer panel
         rule_groups (list): List of rule groups
         output_base (str): Base name for output files
+        rendered (np.ndarray, optional): Images from render_puzzle(), rendered if not given
     """
-    # Render images
-    images = [render_panel(panel) for panel in context]
-    images.append(np.zeros_like(images[0]))  # Empty panel for answer position
-    answer_image = render_panel(answer)
-    
-    # Add the answer at the end
-    all_images = images + [answer_image]
+    all_images = rendered if rendered is not None else render_puzzle(context, answer)
     
     # Create metadata
     meta_matrix, meta_target = serialize_rules(rule_groups)
@@ -255,13 +284,16 @@ def main():
     if output_dir and not os.path.exists(output_dir):
         os.makedirs(output_dir)
     
+    # Render the panels once for both visualization and saving
+    rendered = render_puzzle(context, answer)
+    
     # Visualize puzzle
-    visualize_puzzle(context, answer, args.output, rule_info)
+    visualize_puzzle(context, answer, args.output, rule_info, rendered)
     
     # Save puzzle data if requested
     # if args.save_data:
     #     output_base = os.path.splitext(args.output)[0]
-    #     save_puzzle_data(context, answer, rule_groups, output_base)
+    #     save_puzzle_data(context, answer, rule_groups, output_base, rendered)
     
     print(f"Successfully generated progression puzzle with {args.attr} progression {args.value:+d}")
     if secondary_attr:
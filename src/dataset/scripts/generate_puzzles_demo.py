@@ -164,8 +164,11 @@ def visualize_puzzle(context, answer, output_file, title):
         title (str): Title for the visualization
     """
     # Create a figure with a 3x3 grid
-    fig = plt.figure(figsize=(10, 10))
-    gs = GridSpec(4, 3, height_ratios=[1, 3, 3, 3])
+    # Margins are fixed and the figure is sized so the square panels fill
+    # their cells, so saving needs no extra pass to trim whitespace
+    fig = plt.figure(figsize=(9.2, 10))
+    gs = GridSpec(4, 3, height_ratios=[1, 3, 3, 3], left=0.02, right=0.98, bottom=0.02, top=0.98,
+                  wspace=0.05, hspace=0.05)
     
     # Add a title
     title_ax = fig.add_subplot(gs[0, :])
@@ -204,7 +207,7 @@ def visualize_puzzle(context, answer, output_file, title):
     ax.set_yticks([])
     
     # Save the figure
-    plt.savefig(output_file, dpi=150, bbox_inches='tight')
+    plt.savefig(output_file, dpi=150)
     plt.close()
     
     print(f"Puzzle visualization saved to {output_file}")
@@ -7,15 +7,31 @@ Generate sample RAVEN puzzles for all configurations and rule types.
 
 import os
 import argparse
-import matplotlib.pyplot as plt
-from matplotlib.gridspec import GridSpec
+import contextlib
+import functools
+import multiprocessing
 import traceback
 import sys
 import json
-from PIL import Image
+from PIL import Image, ImageDraw, ImageFont
 
 from dataset.core.puzzle_generator import PuzzleGenerator
 from dataset.legacy.rendering import render_panel
+from dataset.legacy.const import IMAGE_SIZE
+
+# Layout of the composed images, in pixels
+_MARGIN = 15            # Space around the panels
+_PANEL_GAP = 20         # Space between neighbouring panels
+_LABEL_HEIGHT = 30      # Space below a candidate for its letter label
+_LABEL_FONT_SIZE = 24
+_QUESTION_FONT_SIZE = 80
+
+# Fast zlib level for saved PNGs; files grow slightly but encode several times faster
+_PNG_OPTIONS = {"compress_level": 1}
+
+# Rendered panel images keyed on panel fingerprint, emptied when full
+_PANEL_IMAGE_CACHE = {}
+_PANEL_IMAGE_CACHE_SIZE = 4096
 
 def parse_args():
     """Parse command line arguments."""
@@ -33,344 +49,269 @@ def parse_args():
     parser.add_argument("--highlight-solution", action="store_true",
                         help="Highlight the correct solution with a red border")
     
+    parser.add_argument("--save-parts", action="store_true",
+                        help="Also save context, choices and complete puzzle as separate images")
+    
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="Number of processes used to visualize puzzles")
+    
     return parser.parse_args()
 
 def visualize_puzzle(puzzle, output_file):
     """Visualize a puzzle and save as PNG."""
     try:
-        context = puzzle['context']
-        candidates = puzzle['candidates']
-        target_idx = puzzle['target']
-        
-        # Create figure with white background
-        fig = plt.figure(figsize=(10, 12), facecolor='white')
-        plt.subplots_adjust(left=0.1, right=0.9, top=0.95, bottom=0.05, wspace=0.1, hspace=0.2)
-        
-        # Draw the 3x3 context grid
-        render_context_grid(fig, context)
-        
-        # Draw the candidate choices
-        render_candidate_choices(fig, candidates, target_idx)
-        
-        # Save figure without additional padding
-        plt.savefig(output_file, dpi=150, bbox_inches='tight', pad_inches=0.1)
-        plt.close()
+        # Compose the context grid above the choices, highlighting the answer
+        image = compose_puzzle(puzzle, highlight_solution=True)
+        image.save(output_file, **_PNG_OPTIONS)
         return True
         
     except Exception as e:
         print(f"Error visualizing puzzle: {e}")
         traceback.print_exc()
-        plt.close('all')
         return False
 
-def render_context_grid(fig, context):
-    """Render the 3x3 context grid of the puzzle.
+def compose_context_grid(context):
+    """Compose the 3x3 context grid of the puzzle.
     
     Args:
-        fig: Matplotlib figure to draw on
         context: List of 8 context panels
-    """
-    # Main 3x3 grid for context panels
-    for i, panel in enumerate(context):
-        row = i // 3
-        col = i % 3
-        
-        # Calculate position (in figure coordinates)
-        left = 0.15 + col * 0.25
-        bottom = 0.65 - row * 0.2
-        width = 0.2
-        height = 0.19
         
-        # Create axis
-        ax = fig.add_axes([left, bottom, width, height])
-        ax.imshow(render_panel(panel), cmap='gray')
-        
-        # Add border
-        for spine in ax.spines.values():
-            spine.set_visible(True)
-            spine.set_color('black')
-            spine.set_linewidth(1)
-            
-        ax.set_xticks([])
-        ax.set_yticks([])
-    
-    # Add question mark for missing panel
-    ax = fig.add_axes([0.65, 0.25, 0.2, 0.19])
-    ax.text(0.5, 0.5, '?', ha='center', va='center', fontsize=50)
-    for spine in ax.spines.values():
-        spine.set_visible(True)
-        spine.set_color('black')
-        spine.set_linewidth(1)
-    ax.set_xticks([])
-    ax.set_yticks([])
+    Returns:
+        Grayscale PIL image of the grid, with a question mark for the missing panel
+    """
+    step = IMAGE_SIZE + _PANEL_GAP
+    size = 2 * _MARGIN + 3 * IMAGE_SIZE + 2 * _PANEL_GAP
+    canvas = Image.new('L', (size, size), 255)
+    draw = ImageDraw.Draw(canvas)
+    
+    for i in range(9):
+        row, col = divmod(i, 3)
+        x = _MARGIN + col * step
+        y = _MARGIN + row * step
+        
+        if i < len(context):
+            canvas.paste(_get_panel_image(context[i]), (x, y))
+        else:
+            # Add question mark for missing panel
+            canvas.paste(_get_text_image('?', IMAGE_SIZE, _QUESTION_FONT_SIZE), (x, y))
+        _draw_border(draw, x, y, 'black', 1)
+    
+    return canvas
 
-def render_candidate_choices(fig, candidates, target_idx):
-    """Render the candidate choices with labels.
+def compose_candidate_choices(candidates, target_idx, highlight_solution=False):
+    """Compose the candidate choices in two rows of four, with letter labels.
     
     Args:
-        fig: Matplotlib figure to draw on
         candidates: List of 8 candidate panels
         target_idx: Index of the correct answer
+        highlight_solution: Whether to highlight the correct answer with a red border
+        
+    Returns:
+        RGB PIL image of the choices
     """
     # Letter labels for answers
     labels = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H']
     
-    # First row of candidates (A-D)
-    for i in range(4):
-        # Calculate position
-        left = 0.15 + i * 0.2
-        bottom = 0.175
-        width = 0.17
-        height = 0.17
-        
-        # Create axis
-        ax = fig.add_axes([left, bottom, width, height])
-        ax.imshow(render_panel(candidates[i]), cmap='gray')
-        
-        # Add border (red for correct answer)
-        border_color = 'red' if i == target_idx else 'black'
-        border_width = 2 if i == target_idx else 1
+    step_x = IMAGE_SIZE + _PANEL_GAP
+    step_y = IMAGE_SIZE + _LABEL_HEIGHT + _PANEL_GAP
+    width = 2 * _MARGIN + 4 * IMAGE_SIZE + 3 * _PANEL_GAP
+    height = 2 * _MARGIN + 2 * (IMAGE_SIZE + _LABEL_HEIGHT) + _PANEL_GAP
+    canvas = Image.new('RGB', (width, height), (255, 255, 255))
+    draw = ImageDraw.Draw(canvas)
+    
+    for i, candidate in enumerate(candidates):
+        row, col = divmod(i, 4)
+        x = _MARGIN + col * step_x
+        y = _MARGIN + row * step_y
+        canvas.paste(_get_panel_image(candidate), (x, y))
         
-        for spine in ax.spines.values():
-            spine.set_visible(True)
-            spine.set_color(border_color)
-            spine.set_linewidth(border_width)
-            
-        ax.set_xticks([])
-        ax.set_yticks([])
+        # Add letter label below, before the border so it does not cover it
+        canvas.paste(_get_text_image(labels[i], _LABEL_HEIGHT, _LABEL_FONT_SIZE), (x, y + IMAGE_SIZE))
         
-        # Add letter label below
-        fig.text(left + width/2, bottom - 0.03, labels[i], 
-                ha='center', va='center', fontsize=16)
-    
-    # Second row of candidates (E-H)
-    for i in range(4):
-        # Calculate position
-        left = 0.15 + i * 0.2
-        bottom = 0.05
-        width = 0.17
-        height = 0.17
+        # Add border (red for correct answer if highlight_solution is True)
+        is_solution = i == target_idx and highlight_solution
+        _draw_border(draw, x, y, 'red' if is_solution else 'black', 2 if is_solution else 1)
+    
+    return canvas
+
+def compose_puzzle(puzzle, highlight_solution=False):
+    """Compose the context grid above the candidate choices.
+    
+    Args:
+        puzzle: Dictionary containing puzzle data
+        highlight_solution: Whether to highlight the correct answer with a red border
         
-        # Create axis
-        ax = fig.add_axes([left, bottom, width, height])
-        ax.imshow(render_panel(candidates[i+4]), cmap='gray')
+    Returns:
+        RGB PIL image of the complete puzzle
+    """
+    context_img = compose_context_grid(puzzle['context'])
+    choices_img = compose_candidate_choices(puzzle['candidates'], puzzle['target'], highlight_solution)
+    return stack_images(context_img, choices_img)
+
+def stack_images(top_img, bottom_img):
+    """Stack two images vertically, centered on a white background.
+    
+    Args:
+        top_img: PIL image placed at the top
+        bottom_img: PIL image placed below it
         
-        # Add border (red for correct answer)
-        border_color = 'red' if i+4 == target_idx else 'black'
-        border_width = 2 if i+4 == target_idx else 1
+    Returns:
+        RGB PIL image containing both
+    """
+    top_width, top_height = top_img.size
+    bottom_width, bottom_height = bottom_img.size
+    
+    # Use the wider of the two as the width
+    width = max(top_width, bottom_width)
+    height = top_height + bottom_height
+    
+    stacked_img = Image.new('RGB', (width, height), (255, 255, 255))
+    stacked_img.paste(top_img, ((width - top_width) // 2, 0))
+    stacked_img.paste(bottom_img, ((width - bottom_width) // 2, top_height))
+    return stacked_img
+
+def _draw_border(draw, x, y, color, width):
+    """Draw a border of the given width just outside the panel at (x, y)."""
+    draw.rectangle([x - width, y - width, x + IMAGE_SIZE - 1 + width, y + IMAGE_SIZE - 1 + width],
+                   outline=color, width=width)
+
+def _get_panel_image(panel):
+    """Render a panel as a grayscale PIL image, reusing the rendering of an
+    identical panel seen before.
+    
+    Args:
+        panel: Panel (Root node) to render
         
-        for spine in ax.spines.values():
-            spine.set_visible(True)
-            spine.set_color(border_color)
-            spine.set_linewidth(border_width)
-            
-        ax.set_xticks([])
-        ax.set_yticks([])
+    Returns:
+        Grayscale PIL image of the panel, shared between identical panels
+    """
+    # Everything render_panel() reads: the structure and each entity's
+    # attributes and bbox
+    structure_name, entities = panel.prepare()
+    key = (structure_name,) + tuple(
+        (entity.type.get_value_level(), entity.size.get_value_level(), entity.color.get_value_level(),
+         entity.angle.get_value_level(), tuple(entity.bbox))
+        for entity in entities)
+    
+    image = _PANEL_IMAGE_CACHE.get(key)
+    if image is None:
+        if len(_PANEL_IMAGE_CACHE) >= _PANEL_IMAGE_CACHE_SIZE:
+            _PANEL_IMAGE_CACHE.clear()
+        image = _PANEL_IMAGE_CACHE[key] = Image.fromarray(render_panel(panel))
+    return image
+
+@functools.lru_cache(maxsize=None)
+def _get_text_image(text, height, font_size):
+    """Get a panel-wide image of black text centered on white, rendered once
+    so that puzzles only paste it.
+    
+    Args:
+        text: Text to render, e.g. a letter label or the question mark
+        height: Height of the image in pixels
+        font_size: Size of the default font
         
-        # Add letter label below
-        fig.text(left + width/2, bottom - 0.03, labels[i+4], 
-                ha='center', va='center', fontsize=16)
+    Returns:
+        Grayscale PIL image of width IMAGE_SIZE
+    """
+    image = Image.new('L', (IMAGE_SIZE, height), 255)
+    ImageDraw.Draw(image).text((IMAGE_SIZE // 2, height // 2), text, fill=0,
+                               font=ImageFont.load_default(size=font_size), anchor='mm')
+    return image
 
 def ensure_directory(directory_path):
     """Create directory if it doesn't exist."""
     if not os.path.exists(directory_path):
         os.makedirs(directory_path)
 
-def visualize_and_save_puzzle(puzzle, output_base, highlight_solution=False):
-    """Visualize a puzzle and save context and choices as separate PNG files,
-    then combine them into a single image.
+def visualize_and_save_puzzle(puzzle, output_base, highlight_solution=False, save_parts=False):
+    """Visualize a puzzle and save the context grid above the choices as a
+    single combined PNG file, rendered in one pass.
     
     Args:
         puzzle: Dictionary containing puzzle data
         output_base: Base filename without extension
         highlight_solution: Whether to highlight the correct answer with a red border
+        save_parts: Whether to also save the context, choices and complete puzzle
+            as separate PNG files
         
     Returns:
-        bool: True if visualization and saving succeeded
+        bool: True if visualization and saving, including the metadata, succeeded
     """
     try:
-        # Save context grid
-        context_file = f"{output_base}_context.png"
-        context_success = save_context_grid(puzzle['context'], context_file)
+        context_img = compose_context_grid(puzzle['context'])
+        choices_img = compose_candidate_choices(puzzle['candidates'], puzzle['target'], highlight_solution)
+        combined_img = stack_images(context_img, choices_img)
         
-        # Save candidate choices
-        choices_file = f"{output_base}_choices.png"
-        choices_success = save_candidate_choices(puzzle['candidates'], puzzle['target'], choices_file, highlight_solution)
-        
-        # Combine context and choices into a single image
+        # Save the combined image
         combined_file = f"{output_base}_combined.png"
-        combined_success = False
-        if context_success and choices_success:
-            combined_success = combine_images(context_file, choices_file, combined_file)
+        combined_img.save(combined_file, 'PNG', **_PNG_OPTIONS)
         
         # Save metadata in JSON format
         json_file = f"{output_base}.json"
-        if combined_success:
-            metadata_success = save_puzzle_metadata(puzzle, json_file, combined_file)
-        
-        # Also save the complete puzzle (optional)
-        complete_file = f"{output_base}.png"
-        complete_success = save_complete_puzzle(puzzle, complete_file, highlight_solution)
+        metadata_success = save_puzzle_metadata(puzzle, json_file, combined_file)
         
-        # Return success only if all files were saved successfully
-        success = context_success and choices_success and combined_success
+        # Also save the separate images (optional)
+        if save_parts:
+            context_img.save(f"{output_base}_context.png", **_PNG_OPTIONS)
+            choices_img.save(f"{output_base}_choices.png", **_PNG_OPTIONS)
+            combined_img.save(f"{output_base}.png", **_PNG_OPTIONS)
         
-        if success:
-            print(f"    - Combined image saved to: {combined_file}")
+        print(f"    - Combined image saved to: {combined_file}")
+        if metadata_success:
             print(f"    - Metadata saved to: {json_file}")
             
-        return success
+        return metadata_success
         
     except Exception as e:
         print(f"Error visualizing puzzle: {e}")
         traceback.print_exc()
         return False
 
+def visualize_puzzles(jobs, highlight_solution=False, save_parts=False, pool=None):
+    """Visualize and save several puzzles, in parallel if a pool is given.
+    
+    Args:
+        jobs: List of (puzzle, output_base) pairs
+        highlight_solution: Whether to highlight the correct answer with a red border
+        save_parts: Whether to also save the separate images of each puzzle
+        pool: Optional multiprocessing.Pool to spread the puzzles over
+        
+    Returns:
+        List of bool, True for each puzzle whose visualization succeeded
+    """
+    args = [(puzzle, output_base, highlight_solution, save_parts) for puzzle, output_base in jobs]
+    if pool is not None and len(args) > 1:
+        return pool.starmap(visualize_and_save_puzzle, args)
+    return [visualize_and_save_puzzle(*job_args) for job_args in args]
+
 def save_context_grid(context, output_file):
     """Save the 3x3 context grid as a separate file."""
     try:
-        # Create figure with white background
-        fig = plt.figure(figsize=(7.5, 7.5), facecolor='white')
-        
-        # Draw the context grid
-        render_context_grid(fig, context)
-        
-        # Save the figure
-        plt.savefig(output_file, dpi=150, bbox_inches='tight', pad_inches=0.1)
-        plt.close()
+        compose_context_grid(context).save(output_file, **_PNG_OPTIONS)
         return True
     except Exception as e:
         print(f"Error saving context grid: {e}")
         traceback.print_exc()
-        plt.close('all')
         return False
 
 def save_candidate_choices(candidates, target_idx, output_file, highlight_solution=False):
     """Save the candidate choices as a separate file."""
     try:
-        # Create a figure with white background
-        # Increase width and height to provide more space between panels
-        fig = plt.figure(figsize=(10, 5), facecolor='white')
-        
-        # Use a modified version of render_candidate_choices with better spacing
-        render_candidate_choices_separated(fig, candidates, target_idx, highlight_solution)
-        
-        # Save the figure
-        plt.savefig(output_file, dpi=150, bbox_inches='tight', pad_inches=0.1)
-        plt.close()
+        compose_candidate_choices(candidates, target_idx, highlight_solution).save(output_file, **_PNG_OPTIONS)
         return True
     except Exception as e:
         print(f"Error saving candidate choices: {e}")
         traceback.print_exc()
-        plt.close('all')
         return False
 
-def render_candidate_choices_separated(fig, candidates, target_idx, highlight_solution=False):
-    """Render the candidate choices with labels, ensuring they don't overlap.
-    
-    Args:
-        fig: Matplotlib figure to draw on
-        candidates: List of 8 candidate panels
-        target_idx: Index of the correct answer
-        highlight_solution: Whether to highlight the correct answer with a red border
-    """
-    # Letter labels for answers
-    labels = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H']
-    
-    # Set up grid layout that ensures panels don't overlap
-    # Use fixed positions with more spacing between panels
-    
-    # Calculate panel sizes and positions
-    panel_width = 0.15   # Reduced from 0.17
-    panel_height = 0.35  # Increased for better proportions
-    horiz_space = 0.02   # Space between columns
-    vert_space = 0.1     # Space between rows
-    
-    # Starting positions
-    top_row_bottom = 0.55
-    bottom_row_bottom = 0.1
-    
-    # First row of candidates (A-D)
-    for i in range(4):
-        # Calculate position with increased spacing
-        left = 0.1 + i * (panel_width + horiz_space)
-        bottom = top_row_bottom
-        
-        # Create axis
-        ax = fig.add_axes([left, bottom, panel_width, panel_height])
-        ax.imshow(render_panel(candidates[i]), cmap='gray')
-        
-        # Add border (red for correct answer if highlight_solution is True)
-        border_color = 'red' if (i == target_idx and highlight_solution) else 'black'
-        border_width = 2 if (i == target_idx and highlight_solution) else 1
-        
-        for spine in ax.spines.values():
-            spine.set_visible(True)
-            spine.set_color(border_color)
-            spine.set_linewidth(border_width)
-            
-        ax.set_xticks([])
-        ax.set_yticks([])
-        
-        # Add letter label below
-        fig.text(left + panel_width/2, bottom - 0.05, labels[i], 
-                ha='center', va='center', fontsize=16)
-    
-    # Second row of candidates (E-H)
-    for i in range(4):
-        # Calculate position with increased spacing
-        left = 0.1 + i * (panel_width + horiz_space)
-        bottom = bottom_row_bottom
-        
-        # Create axis
-        ax = fig.add_axes([left, bottom, panel_width, panel_height])
-        ax.imshow(render_panel(candidates[i+4]), cmap='gray')
-        
-        # Add border (red for correct answer if highlight_solution is True)
-        border_color = 'red' if (i+4 == target_idx and highlight_solution) else 'black'
-        border_width = 2 if (i+4 == target_idx and highlight_solution) else 1
-        
-        for spine in ax.spines.values():
-            spine.set_visible(True)
-            spine.set_color(border_color)
-            spine.set_linewidth(border_width)
-            
-        ax.set_xticks([])
-        ax.set_yticks([])
-        
-        # Add letter label below
-        fig.text(left + panel_width/2, bottom - 0.05, labels[i+4], 
-                ha='center', va='center', fontsize=16)
-
 def save_complete_puzzle(puzzle, output_file, highlight_solution=False):
     """Save the complete puzzle as a single file."""
     try:
-        context = puzzle['context']
-        candidates = puzzle['candidates']
-        target_idx = puzzle['target']
-        
-        # Create a larger figure to accommodate the non-overlapping candidate layout
-        fig = plt.figure(figsize=(10, 15), facecolor='white')
-        
-        # Add more vertical space for context and separated candidates
-        plt.subplots_adjust(left=0.1, right=0.9, top=0.95, bottom=0.05, hspace=0.4)
-        
-        # Draw context grid (positioned at the top of the figure)
-        ax_context = fig.add_axes([0.05, 0.5, 0.9, 0.45])
-        ax_context.axis('off')
-        render_context_grid(fig, context)
-        
-        # Draw candidate choices (positioned at the bottom with more space)
-        render_candidate_choices_separated(fig, candidates, target_idx, highlight_solution)
-        
-        # Save figure
-        plt.savefig(output_file, dpi=150, bbox_inches='tight', pad_inches=0.1)
-        plt.close()
+        compose_puzzle(puzzle, highlight_solution).save(output_file, **_PNG_OPTIONS)
         return True
     except Exception as e:
         print(f"Error saving complete puzzle: {e}")
         traceback.print_exc()
-        plt.close('all')
         return False
 
 def combine_images(context_file, choices_file, output_file):
@@ -389,24 +330,11 @@ def combine_images(context_file, choices_file, output_file):
         context_img = Image.open(context_file)
         choices_img = Image.open(choices_file)
         
-        # Get the dimensions
-        context_width, context_height = context_img.size
-        choices_width, choices_height = choices_img.size
-        
-        # Create a new image with enough height for both
-        # Use the wider of the two as the width
-        width = max(context_width, choices_width)
-        height = context_height + choices_height
-        
-        # Create new image with white background
-        combined_img = Image.new('RGB', (width, height), (255, 255, 255))
-        
-        # Paste the images
-        combined_img.paste(context_img, ((width - context_width) // 2, 0))
-        combined_img.paste(choices_img, ((width - choices_width) // 2, context_height))
+        # Stack the choices below the context grid
+        combined_img = stack_images(context_img, choices_img)
         
         # Save the combined image
-        combined_img.save(output_file, 'PNG')
+        combined_img.save(output_file, 'PNG', **_PNG_OPTIONS)
         return True
         
     except Exception as e:
@@ -487,70 +415,75 @@ def main():
     total_failures = 0
     failed_combos = []
     
-    for config_name in configs:
-        # Setup directory for this configuration
-        config_dir = os.path.join(args.output_dir, config_name)
-        ensure_directory(config_dir)
-            
-        print(f"\nGenerating puzzles for {config_name}:")
-        
-        # Generate for each rule type
-        for rule_type in rule_types:
-            # Setup directory for this rule type
-            print(f"Rule type: {rule_type}")
-            rule_dir = os.path.join(config_dir, rule_type)
-            ensure_directory(rule_dir)
+    # Visualize puzzles in worker processes, since each one is independent;
+    # with a single worker they are visualized in this process
+    pool_context = multiprocessing.Pool(args.workers) if args.workers > 1 else contextlib.nullcontext()
+    with pool_context as pool:
+        for config_name in configs:
+            # Setup directory for this configuration
+            config_dir = os.path.join(args.output_dir, config_name)
+            ensure_directory(config_dir)
                 
-            # Generate specified number of puzzles
-            success_count = 0
-            failure_count = 0
-            attempt_count = 0
+            print(f"\nGenerating puzzles for {config_name}:")
             
-            while success_count < args.puzzles_per_config and attempt_count < args.max_attempts:
-                attempt_count += 1
+            # Generate for each rule type
+            for rule_type in rule_types:
+                # Setup directory for this rule type
+                print(f"Rule type: {rule_type}")
+                rule_dir = os.path.join(config_dir, rule_type)
+                ensure_directory(rule_dir)
+                    
+                # Generate specified number of puzzles
+                success_count = 0
+                failure_count = 0
+                attempt_count = 0
+                
+                jobs = []
                 
-                try:
-                    # Generate puzzle
-                    print(f"    Attempt {attempt_count}: ", end="", flush=True)
-                    puzzle = generator.generate(config_name, rule_type)
+                while success_count < args.puzzles_per_config and attempt_count < args.max_attempts:
+                    attempt_count += 1
                     
-                    if puzzle:
-                        # Create base output filename without extension
-                        base_filename = f"puzzle_{success_count+1}_{puzzle['attr']}"
-                        output_base = os.path.join(rule_dir, base_filename)
-                        
-                        # Visualize and save the puzzle components
-                        vis_result = visualize_and_save_puzzle(puzzle, output_base, args.highlight_solution)
+                    try:
+                        # Generate puzzle
+                        print(f"    Attempt {attempt_count}: ", end="", flush=True)
+                        puzzle = generator.generate(config_name, rule_type)
                         
-                        # Only count as success if visualization worked
-                        if vis_result:
+                        if puzzle:
                             success_count += 1
-                            # Show whether solution is highlighted
-                            solution_state = "highlighted" if args.highlight_solution else "not highlighted"
-                            print(f"Generated puzzle {success_count}/{args.puzzles_per_config}: "
-                                  f"{puzzle['attr']} (Solution: {solution_state})")
-                            print(f"    - Saved to: {output_base}_context.png and {output_base}_choices.png")
+                            
+                            # Create base output filename without extension
+                            base_filename = f"puzzle_{success_count}_{puzzle['attr']}"
+                            jobs.append((puzzle, os.path.join(rule_dir, base_filename)))
+                            print(f"Generated puzzle {success_count}/{args.puzzles_per_config}: {puzzle['attr']}")
                         else:
                             failure_count += 1
-                            print("Visualization failed - rendering issues detected")
-                    else:
+                            print("Generation failed")
+                            
+                    except Exception as e:
                         failure_count += 1
-                        print("Generation failed")
-                        
-                except Exception as e:
-                    failure_count += 1
-                    print(f"Error: {e}")
-                    print("Full stack trace:")
-                    traceback.print_exc()
-            
-            # Update statistics
-            total_attempts += attempt_count
-            total_successes += success_count
-            total_failures += failure_count
-            
-            # Record if we didn't meet the quota
-            if success_count < args.puzzles_per_config:
-                failed_combos.append((config_name, rule_type, success_count, failure_count))
+                        print(f"Error: {e}")
+                        print("Full stack trace:")
+                        traceback.print_exc()
+                
+                # Visualize and save the puzzle components, only counting
+                # puzzles as successes if visualization worked
+                solution_state = "highlighted" if args.highlight_solution else "not highlighted"
+                print(f"    Saving {len(jobs)} puzzles (Solution: {solution_state})")
+                vis_results = visualize_puzzles(jobs, args.highlight_solution, args.save_parts, pool)
+                vis_failures = vis_results.count(False)
+                if vis_failures:
+                    success_count -= vis_failures
+                    failure_count += vis_failures
+                    print(f"    Visualization failed for {vis_failures} puzzles - rendering issues detected")
+                
+                # Update statistics
+                total_attempts += attempt_count
+                total_successes += success_count
+                total_failures += failure_count
+                
+                # Record if we didn't meet the quota
+                if success_count < args.puzzles_per_config:
+                    failed_combos.append((config_name, rule_type, success_count, failure_count))
     
     # Print summary
     print("\n=== Generation Summary ===")
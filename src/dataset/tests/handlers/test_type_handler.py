@@ -0,0 +1,50 @@
+"""Unit tests for the TypeHandler bulk operations."""
+
+import unittest
+from dataset.core.aot.aot_facade import AoTFacade
+from dataset.core.handlers.type_handler import TypeHandler
+from dataset.legacy.build_tree import build_distribute_four
+from dataset.tests.helpers import sample_panel
+
+
+class TestTypeHandler(unittest.TestCase):
+    """Test cases for setting and cycling types across a component."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.facade = AoTFacade(sample_panel(build_distribute_four))
+        self.handler = TypeHandler()
+    
+    def test_set_panel_value(self):
+        """Test that every entity gets the clamped type value."""
+        self.handler.set_panel_value(self.facade, 7)
+        types = [entity.get_type() for entity in self.facade.get_entities()]
+        self.assertEqual(types, [5] * self.facade.get_entity_count())
+    
+    def test_next_shape_matches_per_entity(self):
+        """Test that cycling all entities matches cycling each entity."""
+        expected = [((entity.get_type() - 1 + 3) % 5) + 1 for entity in self.facade.get_entities()]
+        self.handler.next_shape(self.facade, steps=3)
+        types = [entity.get_type() for entity in self.facade.get_entities()]
+        self.assertEqual(types, expected)
+        self.assertTrue(all(isinstance(value, int) for value in types))
+    
+    def test_apply_constraints(self):
+        """Test that the layout and every entity get the new type bounds."""
+        self.handler.apply_constraints(self.facade, [2, 3])
+        layout = self.facade.get_layout()
+        self.assertEqual(layout.entity_constraint["Type"], [2, 3])
+        for entity in layout.children:
+            self.assertEqual(entity.entity_constraint["Type"], [2, 3])
+            self.assertEqual((entity.type.min_level, entity.type.max_level), (2, 3))
+    
+    def test_get_shape_name(self):
+        """Test shape name lookup and validation."""
+        self.assertEqual(self.handler.get_shape_name(1), "triangle")
+        self.assertEqual(self.handler.get_shape_name(5.0), "circle")
+        with self.assertRaises(ValueError):
+            self.handler.get_shape_name(0)
+
+
+if __name__ == "__main__":
+    unittest.main()
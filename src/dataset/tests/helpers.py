@@ -0,0 +1,27 @@
+"""Shared fixtures for the unit tests."""
+
+import numpy as np
+from dataset.legacy.Rule import Rule_Wrapper
+
+
+def sample_panel(build_tree, rule_name="Progression", attr="Number", param=(1,), seed=42):
+    """Sample a concrete panel from a pruned configuration tree.
+
+    Args:
+        build_tree: Configuration builder from dataset.legacy.build_tree
+        rule_name: Name of the rule the tree is pruned for
+        attr: Attribute the rule applies to
+        param: Rule parameters
+        seed: Seed for numpy's global random state
+
+    Returns:
+        The sampled root node
+    """
+    np.random.seed(seed)
+    root = build_tree().prune([[Rule_Wrapper(rule_name, attr, list(param), 0)]])
+    return root.sample()
+
+
+def first_layout(panel):
+    """Get the layout node of the first component of a panel."""
+    return panel.children[0].children[0].children[0]
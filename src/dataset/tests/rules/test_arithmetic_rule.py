@@ -0,0 +1,45 @@
+"""Unit tests for the ArithmeticRule Position sampling."""
+
+import unittest
+import numpy as np
+
+from dataset.core.rules.arithmetic import ArithmeticRule
+from dataset.legacy.build_tree import build_distribute_four
+from dataset.tests.helpers import first_layout, sample_panel
+
+
+class TestArithmeticRule(unittest.TestCase):
+    """Test cases for sampling the second column of a Position rule."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.layout = first_layout(sample_panel(build_distribute_four, "Constant", "Number", (0,)))
+        self.current = np.array([0, 2])
+
+    def test_union_adds_a_position(self):
+        """Test that UNION always samples a position outside the first column."""
+        rule = ArithmeticRule("Position", 1)
+        for _ in range(50):
+            rule._sample_second_position(self.current, self.layout)
+            value_idx = self.layout.position.get_value_idx()
+            self.assertEqual(len(value_idx), self.layout.number.get_value())
+            self.assertFalse(set(value_idx) <= set(self.current))
+
+    def test_diff_leaves_a_position(self):
+        """Test that DIFF never covers all positions of the first column."""
+        rule = ArithmeticRule("Position", -1)
+        for _ in range(50):
+            rule._sample_second_position(self.current, self.layout)
+            value_idx = self.layout.position.get_value_idx()
+            self.assertEqual(len(set(value_idx)), self.layout.number.get_value())
+            self.assertFalse(set(self.current) <= set(value_idx))
+
+    def test_union_without_free_position(self):
+        """Test that UNION fails instead of looping when every slot is taken."""
+        rule = ArithmeticRule("Position", 1)
+        with self.assertRaises(ValueError):
+            rule._sample_second_position(np.arange(4), self.layout)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -266,6 +266,14 @@ class TestProgressionRule(unittest.TestCase):
         self.assertEqual(len(new_layout1.children), new_number1, "New rule: Entity count mismatch after first application")
         self.assertEqual(len(new_layout2.children), new_number2, "New rule: Entity count mismatch after second application")
 
+    def test_zero_step_identity(self):
+        """Test that only a zero-step Position progression is an identity rule."""
+        self.assertTrue(ProgressionRule("Position", 0).is_identity())
+        self.assertFalse(ProgressionRule("Position", 1).is_identity())
+        # Number resamples positions and entity attributes are made consistent
+        self.assertFalse(ProgressionRule("Number", 0).is_identity())
+        self.assertFalse(ProgressionRule("Size", 0).is_identity())
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+
+from dataset.core.rules.factory import RuleFactory
+from dataset.core.rules.progression import ProgressionRule
+
+
+class TestRuleFactory(unittest.TestCase):
+    """Test suite for config-based rule creation."""
+    
+    def setUp(self):
+        """Set up test fixtures before each test."""
+        self.factory = RuleFactory()
+    
+    def test_create_from_config(self):
+        """Test that config parameters are passed to the rule."""
+        rule = self.factory.create_from_config(
+            {"type": "Progression", "attr": "Number", "parameters": {"value": 1}})
+        self.assertIsInstance(rule, ProgressionRule)
+        self.assertEqual(rule.attr, "Number")
+        self.assertEqual(rule.value, 1)
+    
+    def test_cached_rules_have_independent_state(self):
+        """Test that rules built from the same config do not share state."""
+        config = {"type": "Arithmetic", "attr": "Size", "parameters": {"value": 1}}
+        first = self.factory.create_from_config(config)
+        first.state["memory"].append(3)
+        second = self.factory.create_from_config(config)
+        self.assertIsNot(first, second)
+        self.assertEqual(second.state["memory"], [])
+    
+    def test_unknown_rule_type(self):
+        """Test that unknown rule types are rejected."""
+        with self.assertRaises(ValueError):
+            self.factory.create_from_config({"type": "Unknown", "attr": "Size"})
+
+
+if __name__ == "__main__":
+    unittest.main()
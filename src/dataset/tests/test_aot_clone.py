@@ -0,0 +1,60 @@
+"""Unit tests for copying concrete AoTs with clone()."""
+
+import unittest
+from dataset.legacy.build_tree import build_distribute_nine
+from dataset.tests.helpers import first_layout, sample_panel
+
+
+class TestAoTClone(unittest.TestCase):
+    """Test cases for AoTNode.clone on a sampled panel."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.panel = sample_panel(build_distribute_nine)
+        self.layout = first_layout(self.panel)
+    
+    def test_clone_is_independent(self):
+        """Test that modifying the clone leaves the original untouched."""
+        clone = self.panel.clone()
+        clone_layout = first_layout(clone)
+        
+        self.assertIsNot(clone_layout, self.layout)
+        self.assertEqual(len(clone_layout.children), len(self.layout.children))
+        
+        original_type = self.layout.children[0].type.get_value_level()
+        clone_layout.children[0].type.set_value_level(original_type + 1)
+        clone_layout.children[0].type.previous_values.append(original_type)
+        clone_layout.position.value_idx[0] = -1
+        del clone_layout.children[1:]
+        
+        self.assertEqual(self.layout.children[0].type.get_value_level(), original_type)
+        self.assertEqual(self.layout.children[0].type.previous_values, [])
+        self.assertNotEqual(self.layout.position.value_idx[0], -1)
+        self.assertGreater(len(self.layout.children), 1)
+    
+    def test_clone_keeps_shared_constraints(self):
+        """Test that constraint dicts are shared in the clone as in the original."""
+        clone_layout = first_layout(self.panel.clone())
+        
+        self.assertIsNot(clone_layout.entity_constraint, self.layout.entity_constraint)
+        self.assertIs(self.layout.children[0].entity_constraint, self.layout.entity_constraint)
+        for entity, clone_entity in zip(self.layout.children, clone_layout.children):
+            self.assertEqual(entity.entity_constraint is self.layout.entity_constraint,
+                             clone_entity.entity_constraint is clone_layout.entity_constraint)
+        
+        clone_layout.children[0].reset_constraint("Size", 1, 2)
+        self.assertEqual(clone_layout.entity_constraint["Size"], [1, 2])
+        self.assertNotEqual(self.layout.entity_constraint["Size"], [1, 2])
+
+    def test_rebuilt_entities_share_layout_constraints(self):
+        """Test that rebuilt entities use their layout's constraint dict, as sampled ones do."""
+        clone_layout = first_layout(self.panel.clone())
+        clone_layout.rebuild_entities(self.layout.children[0], resample=True)
+
+        for entity in clone_layout.children:
+            self.assertIs(entity.entity_constraint, clone_layout.entity_constraint)
+        self.assertIsNot(clone_layout.entity_constraint, self.layout.entity_constraint)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+"""Unit tests for parallel puzzle generation with PuzzleGenerator.generate_batch."""
+
+import unittest
+from dataset.core.puzzle_generator import PuzzleGenerator
+
+
+def _panel_summary(panel):
+    """Summarize the layout and entity levels of every component of a panel."""
+    summary = []
+    for component in panel.children[0].children:
+        layout = component.children[0]
+        entities = tuple((entity.type.get_value_level(), entity.size.get_value_level(),
+                          entity.color.get_value_level(), entity.angle.get_value_level())
+                         for entity in layout.children)
+        summary.append((layout.number.get_value_level(), tuple(layout.position.get_value_idx()), entities))
+    return tuple(summary)
+
+
+def _puzzle_summary(puzzle):
+    """Summarize a generated puzzle so that puzzles can be compared by value."""
+    if puzzle is None:
+        return None
+    return (puzzle["config"], puzzle["rule_type"], puzzle["attr"], puzzle["value"], puzzle["target"],
+            tuple(_panel_summary(panel) for panel in puzzle["context"]),
+            tuple(_panel_summary(panel) for panel in puzzle["candidates"]))
+
+
+class TestGenerateBatch(unittest.TestCase):
+    """Test cases for seeding and ordering in generate_batch."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.generator = PuzzleGenerator()
+        self.specs = [("distribute_four", "Progression"), ("distribute_nine", None),
+                      ("distribute_four", "Constant"), ("distribute_nine", "Arithmetic"),
+                      ("distribute_four", None)]
+
+    def test_results_follow_spec_order(self):
+        """Test that every result belongs to the spec at the same index."""
+        results = self.generator.generate_batch(self.specs, workers=2, seed=7)
+
+        self.assertEqual(len(results), len(self.specs))
+        for (config_name, rule_type), puzzle in zip(self.specs, results):
+            self.assertIsNotNone(puzzle)
+            self.assertEqual(puzzle["config"], config_name)
+            if rule_type is not None:
+                self.assertEqual(puzzle["rule_type"], rule_type)
+
+    def test_results_do_not_depend_on_worker_count(self):
+        """Test that the same seed gives the same puzzles for any number of workers."""
+        single = self.generator.generate_batch(self.specs, workers=1, seed=7)
+        multiple = self.generator.generate_batch(self.specs, workers=3, seed=7)
+
+        self.assertEqual([_puzzle_summary(puzzle) for puzzle in single],
+                         [_puzzle_summary(puzzle) for puzzle in multiple])
+
+
+if __name__ == "__main__":
+    unittest.main()
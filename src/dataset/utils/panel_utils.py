@@ -6,13 +6,15 @@ from dataset.core.puzzle_generator import PuzzleGenerator
 from dataset.core.aot.aot_facade import AoTFacade
 from dataset.legacy.rendering import render_panel
 
+# Shared generator, so its per-config feasibility tables are built once
+_GENERATOR = PuzzleGenerator()
+
 def generate_sample_panel():
     """Generate a distribute_nine panel using PuzzleGenerator.
     Returns:
         facade: An AoTFacade wrapping the generated panel
     """
-    generator = PuzzleGenerator()
-    puzzle = generator.generate("distribute_nine")
+    puzzle = _GENERATOR.generate("distribute_nine")
     panel = puzzle['context'][0]  # Take the first context panel
     facade = AoTFacade(panel)
     return facade